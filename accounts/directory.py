@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'user-directory:version'
+DIRECTORY_KEY = 'user-directory:{}'
+DIRECTORY_TIMEOUT = 60 * 60 * 24
+# How long a process trusts its copy before comparing versions again
+CHECK_SECONDS = 2
+
+# Fields of the compact profile nested in leads, notes, reminders and correspondence
+SUMMARY_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name', 'role', 'avatar')
+
+# Saves touching only these fields leave the public profile unchanged
+PRIVATE_FIELDS = frozenset({'last_login', 'password'})
+
+_local = {'directory': None, 'version': None, 'checked_at': 0.0}
+_lock = threading.Lock()
+
+
+class UserDirectory:
+    """Every user's public profile, keyed by id, as ``UserSerializer`` renders it."""
+
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.summaries = {
+            pk: {field: profile[field] for field in SUMMARY_FIELDS}
+            for pk, profile in profiles.items()
+        }
+
+    def profile(self, user_id):
+        return self.profiles.get(user_id)
+
+    def summary(self, user_id):
+        if user_id is None:
+            return None
+        summary = self.summaries.get(user_id)
+        if summary is None:
+            # Created since this copy was loaded
+            profile = _load_profiles(User.objects.filter(pk=user_id)).get(user_id)
+            summary = profile and {field: profile[field] for field in SUMMARY_FIELDS}
+        return summary
+
+    def users(self, role=None):
+        profiles = self.profiles.values()
+        if role:
+            profiles = [profile for profile in profiles if profile['role'] == role]
+        return list(profiles)
+
+
+def _load_profiles(queryset):
+    from .serializers import UserSerializer
+
+    return {
+        profile['id']: dict(profile)
+        for profile in UserSerializer(queryset.order_by('id'), many=True).data
+    }
+
+
+def _cache_call(method, *args):
+    try:
+        return getattr(cache, method)(*args)
+    except Exception:
+        logger.warning('User directory cache unavailable', exc_info=True)
+        return None
+
+
+def get_directory():
+    """
+    The user directory, from process memory when it is still current.
+
+    Processes share one copy in the cache under a version key; saving a
+    user moves the version, and each process notices within CHECK_SECONDS.
+    Without the cache every check reloads from the database.
+    """
+    now = time.monotonic()
+    directory = _local['directory']
+    if directory is not None and now - _local['checked_at'] < CHECK_SECONDS:
+        return directory
+
+    with _lock:
+        version = _cache_call('get_or_set', VERSION_KEY, uuid.uuid4().hex, None)
+        if version is None or version != _local['version'] or _local['directory'] is None:
+            profiles = version and _cache_call('get', DIRECTORY_KEY.format(version))
+            if profiles is None:
+                profiles = _load_profiles(User.objects.all())
+                if version is not None:
+                    _cache_call('set', DIRECTORY_KEY.format(version), profiles, DIRECTORY_TIMEOUT)
+            _local['directory'] = UserDirectory(profiles)
+            _local['version'] = version
+        _local['checked_at'] = now
+        return _local['directory']
+
+
+def invalidate_directory():
+    _local['version'] = None
+    _local['checked_at'] = 0.0
+    _cache_call('set', VERSION_KEY, uuid.uuid4().hex, None)
+
+
+@receiver(post_save, sender=User)
+def _user_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields and PRIVATE_FIELDS.issuperset(update_fields):
+        return
+    transaction.on_commit(invalidate_directory)
+
+
+@receiver(post_delete, sender=User)
+def _user_deleted(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_directory)
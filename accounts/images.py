@@ -0,0 +1,86 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Encoded variants of each avatar size: (format, file extension, save options)
+AVATAR_FORMATS = (
+    ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    ('JPEG', 'jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+def avatar_urls(variants):
+    """``{'64': {'webp': url, 'jpeg': url}, ...}`` for stored variants, or None."""
+    if not variants:
+        return None
+    return {
+        size: {ext: default_storage.url(name) for ext, name in files.items()}
+        for size, files in variants.items()
+    }
+
+
+def _open_image(field, largest):
+    """Decode an upload upright and small enough for the largest thumbnail."""
+    from PIL import Image, ImageOps
+
+    with field.open('rb') as f:
+        image = Image.open(f)
+        width, height = image.size
+        # JPEG can decode straight at a reduced scale, much cheaper for phone photos
+        image.draft('RGB', (largest * 2, largest * 2))
+        drafted = image.size
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.size != drafted:
+        width, height = height, width
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    return image, width, height
+
+
+def _encode(image, fmt, options):
+    from PIL import Image
+
+    if fmt == 'JPEG' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    # No exif/icc arguments, so camera metadata and location are dropped
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def build_avatar_variants(user):
+    """
+    Write square thumbnails of ``user.profile_picture`` in every size and format.
+
+    Returns ``(width, height, variants)`` where width and height describe
+    the original upload; the caller stores them on the user.
+    """
+    from PIL import Image, ImageOps
+
+    sizes = sorted(settings.AVATAR_SIZES)
+    image, width, height = _open_image(user.profile_picture, sizes[-1])
+
+    stem = os.path.splitext(os.path.basename(user.profile_picture.name))[0]
+    variants = {}
+    for size in sizes:
+        thumb = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        variants[str(size)] = {
+            ext: default_storage.save(
+                f"profile_pictures/thumbs/{user.pk}/{stem}-{size}.{ext}",
+                _encode(thumb, fmt, options),
+            )
+            for fmt, ext, options in AVATAR_FORMATS
+        }
+    return width, height, variants
+
+
+def delete_variants(variants):
+    for files in (variants or {}).values():
+        for name in files.values():
+            default_storage.delete(name)
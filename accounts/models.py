@@ -10,6 +10,10 @@ class User(AbstractUser):
     role = models.CharField(max_length=10, choices=Role.choices, default=Role.AGENT)
     phone_number = models.CharField(max_length=20, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    # Filled in by the thumbnail task after an upload
+    profile_picture_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    profile_picture_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     department = models.CharField(max_length=100, blank=True)
     
     USERNAME_FIELD = 'email'
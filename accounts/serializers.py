@@ -1,15 +1,83 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from .images import avatar_urls
+from .directory import get_directory
 
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
+    avatar = serializers.SerializerMethodField()
+    
     class Meta:
         model = User
         fields = ['id', 'email', 'username', 'first_name', 'last_name', 
-                 'role', 'phone_number', 'department', 'date_joined']
+                 'role', 'phone_number', 'department', 'date_joined', 'avatar']
         read_only_fields = ['id', 'date_joined']
+    
+    def get_avatar(self, obj):
+        return avatar_urls(obj.profile_picture_variants)
+
+class UserSummaryField(serializers.Field):
+    """Renders a user id as the compact profile from the cached user directory."""
+    
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+    
+    def to_representation(self, value):
+        return get_directory().summary(value)
+
+class DirectoryUserField(serializers.Field):
+    """
+    Accepts a user id, checked against the cached user directory.
+    
+    Returns a ``User`` carrying the directory's fields, the rest deferred,
+    so validating an assignment does not query the users table.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Invalid pk "{pk_value}" - object does not exist.',
+        'incorrect_type': 'Incorrect type. Expected pk value, received {data_type}.',
+    }
+    LOADED_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name', 'role')
+    
+    def __init__(self, role=None, **kwargs):
+        self.role = role
+        super().__init__(**kwargs)
+    
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        profile = get_directory().profile(pk)
+        if profile is None or (self.role and profile['role'] != self.role):
+            self.fail('does_not_exist', pk_value=data)
+        # from_db expects the values in model field order
+        names = [f.attname for f in User._meta.concrete_fields if f.attname in self.LOADED_FIELDS]
+        return User.from_db(DEFAULT_DB_ALIAS, names, [profile[name] for name in names])
+    
+    def to_representation(self, value):
+        return value.pk
+
+class ProfilePictureSerializer(serializers.Serializer):
+    # A plain FileField so the request never decodes the image; the
+    # thumbnail task rejects files Pillow cannot read.
+    profile_picture = serializers.FileField()
+    
+    def validate_profile_picture(self, value):
+        extension = value.name.rsplit('.', 1)[-1].lower() if '.' in value.name else ''
+        if extension not in settings.PROFILE_PICTURE_EXTENSIONS:
+            raise serializers.ValidationError(
+                f"Unsupported file type. Use one of: {', '.join(settings.PROFILE_PICTURE_EXTENSIONS)}."
+            )
+        if value.size > settings.PROFILE_PICTURE_MAX_BYTES:
+            raise serializers.ValidationError("File is too large.")
+        return value
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
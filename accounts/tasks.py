@@ -0,0 +1,49 @@
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from .directory import invalidate_directory
+from .images import build_avatar_variants, delete_variants
+from .tokens import prune_expired_tokens, warm_revoked_tokens
+
+User = get_user_model()
+
+@shared_task(acks_late=True, soft_time_limit=900, time_limit=960)
+def prune_token_blacklist(chunk_size=1000):
+    deleted = prune_expired_tokens(chunk_size=chunk_size)
+    cached = warm_revoked_tokens(chunk_size=chunk_size)
+    return f"Pruned {deleted} expired tokens and cached {cached} revocations"
+
+@shared_task(acks_late=True, soft_time_limit=60, time_limit=90)
+def process_profile_picture(user_id, name):
+    from PIL import Image, UnidentifiedImageError
+
+    user = User.objects.filter(pk=user_id, profile_picture=name).first()
+    if user is None:
+        return f"Profile picture {name} was replaced before processing"
+    
+    try:
+        width, height, variants = build_avatar_variants(user)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        # Not an image we will decode: drop the upload rather than serve it,
+        # along with the sizes built from the picture it replaced
+        rejected = User.objects.filter(pk=user_id, profile_picture=name).update(
+            profile_picture=None,
+            profile_picture_width=None,
+            profile_picture_height=None,
+            profile_picture_variants={},
+        )
+        user.profile_picture.delete(save=False)
+        if rejected:
+            delete_variants(user.profile_picture_variants)
+            invalidate_directory()
+        return f"Rejected unusable profile picture for user {user_id}"
+    
+    updated = User.objects.filter(pk=user_id, profile_picture=name).update(
+        profile_picture_width=width,
+        profile_picture_height=height,
+        profile_picture_variants=variants,
+    )
+    # Remove whichever set is no longer referenced
+    delete_variants(user.profile_picture_variants if updated else variants)
+    if updated:
+        invalidate_directory()
+    return f"Built {len(variants)} avatar sizes for user {user_id}"
@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+
+from . import tokens
+from .models import User
+from .tokens import RefreshToken, is_revoked, get_revocation_store, warm_revoked_tokens
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, TOKEN_REVOCATION_REDIS_URL='local')
+class TokenRevocationTests(TestCase):
+
+    def setUp(self):
+        tokens._store = None
+        tokens._unsaved.clear()
+        self.user = User.objects.create_user(
+            email='agent@example.com', username='agent', password='x', role='agent',
+        )
+
+    def issue(self):
+        refresh = RefreshToken.for_user(self.user)
+        return refresh, refresh['jti']
+
+    def test_complete_set_answers_without_queries(self):
+        warm_revoked_tokens()
+        revoked, revoked_jti = self.issue()
+        revoked.blacklist()
+        _, valid_jti = self.issue()
+
+        with self.assertNumQueries(0):
+            self.assertTrue(is_revoked(revoked_jti))
+            self.assertFalse(is_revoked(valid_jti))
+
+    def test_hot_refresh_path_does_not_read_the_blacklist(self):
+        warm_revoked_tokens()
+        refresh, _ = self.issue()
+        client = APIClient()
+
+        # Rotation only: look up the outstanding token, then blacklist it in
+        # a savepoint (select, savepoint, insert, release).
+        with self.assertNumQueries(5):
+            response = client.post('/api/auth/token/refresh/', {'refresh': str(refresh)}, format='json', secure=True)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = client.post('/api/auth/token/refresh/', {'refresh': str(refresh)}, format='json', secure=True)
+        self.assertEqual(response.status_code, 401)
+
+    def test_incomplete_set_is_checked_against_the_table_and_rebuilt(self):
+        revoked, revoked_jti = self.issue()
+        revoked.blacklist()
+        tokens._store = None  # a new process, or an evicted set
+
+        with self.assertNumQueries(2):  # this jti, then the rebuild
+            self.assertTrue(is_revoked(revoked_jti))
+        _, valid_jti = self.issue()
+        with self.assertNumQueries(0):
+            self.assertFalse(is_revoked(valid_jti))
+
+    def test_failed_write_leaves_the_revocation_visible(self):
+        warm_revoked_tokens()
+        revoked, revoked_jti = self.issue()
+        store = get_revocation_store()
+        with mock.patch.object(store, 'add', side_effect=ConnectionError):
+            revoked.blacklist()
+
+        self.assertTrue(is_revoked(revoked_jti))
+        with self.assertRaises(TokenError):
+            RefreshToken(str(revoked))
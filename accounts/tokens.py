@@ -0,0 +1,233 @@
+import logging
+import threading
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+logger = logging.getLogger(__name__)
+
+REVOKED_SET_KEY = 'jwt-revoked'
+# Member present while the set holds every unexpired revocation
+COMPLETE_MEMBER = '*'
+REBUILD_LOCK_KEY = 'jwt-revoked:rebuild'
+REBUILD_LOCK_SECONDS = 60
+
+
+class RedisRevocationSet:
+    """
+    Revoked jtis in one Redis sorted set, scored by expiry.
+
+    A lookup and the completeness check are one round trip. Redis evicts
+    the key as a whole, so an evicted set reads as incomplete rather than
+    as "nothing revoked".
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(
+            url,
+            socket_timeout=settings.TOKEN_REVOCATION_REDIS_TIMEOUT,
+            socket_connect_timeout=settings.TOKEN_REVOCATION_REDIS_TIMEOUT,
+        )
+
+    def add(self, revoked):
+        self.client.zadd(REVOKED_SET_KEY, {jti: expires_at.timestamp() for jti, expires_at in revoked})
+
+    def lookup(self, jti):
+        """True if revoked, False if not, None while the set may be incomplete."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zscore(REVOKED_SET_KEY, jti)
+        pipe.zscore(REVOKED_SET_KEY, COMPLETE_MEMBER)
+        revoked, complete = pipe.execute()
+        if revoked is not None:
+            return True
+        return False if complete is not None else None
+
+    def mark_complete(self):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zremrangebyscore(REVOKED_SET_KEY, '-inf', time.time())
+        pipe.zadd(REVOKED_SET_KEY, {COMPLETE_MEMBER: float('inf')})
+        pipe.execute()
+
+    def mark_incomplete(self):
+        self.client.zrem(REVOKED_SET_KEY, COMPLETE_MEMBER)
+
+    def claim_rebuild(self):
+        return bool(self.client.set(REBUILD_LOCK_KEY, 1, nx=True, ex=REBUILD_LOCK_SECONDS))
+
+
+class LocalRevocationSet:
+    """In-process stand-in for the Redis set, for development and tests."""
+
+    def __init__(self):
+        self.revoked = {}
+        self.complete = False
+        self.lock = threading.Lock()
+
+    def add(self, revoked):
+        with self.lock:
+            self.revoked.update((jti, expires_at.timestamp()) for jti, expires_at in revoked)
+
+    def lookup(self, jti):
+        with self.lock:
+            if jti in self.revoked:
+                return True
+            return False if self.complete else None
+
+    def mark_complete(self):
+        now = time.time()
+        with self.lock:
+            self.revoked = {jti: exp for jti, exp in self.revoked.items() if exp > now}
+            self.complete = True
+
+    def mark_incomplete(self):
+        with self.lock:
+            self.complete = False
+
+    def claim_rebuild(self):
+        return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+# Revocations this process could not write to the set yet
+_unsaved = {}
+_unsaved_lock = threading.Lock()
+
+
+def get_revocation_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                url = settings.TOKEN_REVOCATION_REDIS_URL
+                if url.startswith(('redis://', 'rediss://')):
+                    _store = RedisRevocationSet(url)
+                else:
+                    _store = LocalRevocationSet()
+    return _store
+
+
+def remember_revoked(jti, expires_at):
+    store = get_revocation_store()
+    try:
+        store.add([(jti, expires_at)])
+    except Exception:
+        logger.warning('Could not cache revoked token %s', jti, exc_info=True)
+        with _unsaved_lock:
+            _unsaved[jti] = expires_at
+        try:
+            store.mark_incomplete()
+        except Exception:
+            pass
+
+
+def _save_unsaved(store):
+    with _unsaved_lock:
+        pending = list(_unsaved.items())
+    if pending:
+        store.add(pending)
+        with _unsaved_lock:
+            for jti, _expires_at in pending:
+                _unsaved.pop(jti, None)
+
+
+def warm_revoked_tokens(chunk_size=1000):
+    """Load every unexpired blacklisted jti into the revoked set, then mark it complete."""
+    store = get_revocation_store()
+    revoked = (
+        BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        .values_list('token__jti', 'token__expires_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    count = 0
+    while True:
+        rows = list(islice(revoked, chunk_size))
+        if not rows:
+            break
+        store.add(rows)
+        count += len(rows)
+    store.mark_complete()
+    return count
+
+
+def is_revoked(jti):
+    """
+    Whether the token was blacklisted.
+
+    Answered from the revoked set alone while it is complete. The
+    blacklist table is read only when the set is incomplete (after a
+    restart of Redis, an eviction or a failed write) or unreachable; an
+    incomplete set is then rebuilt by the first request to claim it.
+    """
+    store = get_revocation_store()
+    try:
+        _save_unsaved(store)
+        revoked = store.lookup(jti)
+    except Exception:
+        logger.warning('Revoked token set unavailable, checking the blacklist table', exc_info=True)
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+    if revoked is not None:
+        return revoked
+
+    revoked = BlacklistedToken.objects.filter(token__jti=jti).exists()
+    try:
+        if store.claim_rebuild():
+            warm_revoked_tokens()
+    except Exception:
+        logger.warning('Could not rebuild the revoked token set', exc_info=True)
+    return revoked
+
+
+def prune_expired_tokens(chunk_size=1000):
+    """
+    Delete expired outstanding tokens and their blacklist entries in chunks.
+
+    Walks the table by primary key so each DELETE stays small.
+    ``expires_at`` is not indexed, so the last query, which finds nothing
+    left to delete, scans every unexpired row once.
+    """
+    now = timezone.now()
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(id__gt=last_id, expires_at__lte=now)
+            .order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        count, _ = OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += count
+        last_id = ids[-1]
+    return deleted
+
+
+class RefreshToken(tokens.RefreshToken):
+    """Refresh token whose blacklist check is answered from the revoked set."""
+
+    def check_blacklist(self):
+        if is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        remember_revoked(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload['exp']))
+        return blacklisted
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = RefreshToken
@@ -0,0 +1,15 @@
+from django.urls import path
+from .views import (
+    RegisterView, UserListView, UserDetailView, ChangePasswordView,
+    CurrentUserView, ProfilePictureView, LogoutView
+)
+
+urlpatterns = [
+    path('auth/register/', RegisterView.as_view(), name='register'),
+    path('auth/logout/', LogoutView.as_view(), name='logout'),
+    path('auth/change-password/', ChangePasswordView.as_view(), name='change_password'),
+    path('users/', UserListView.as_view(), name='user_list'),
+    path('users/me/', CurrentUserView.as_view(), name='current_user'),
+    path('users/me/profile-picture/', ProfilePictureView.as_view(), name='profile_picture'),
+    path('users/<int:pk>/', UserDetailView.as_view(), name='user_detail'),
+]
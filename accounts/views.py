@@ -1,9 +1,16 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser, FormParser
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import RefreshToken
-from .serializers import UserSerializer, RegisterSerializer, ChangePasswordSerializer
+from django.db import transaction
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.views import TokenObtainPairView
+from .serializers import UserSerializer, RegisterSerializer, ChangePasswordSerializer, ProfilePictureSerializer
+from .tasks import process_profile_picture
+from .tokens import RefreshToken
+from .images import delete_variants
+from .directory import get_directory
 
 User = get_user_model()
 
@@ -11,16 +18,35 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = [permissions.AllowAny]
     serializer_class = RegisterSerializer
+    throttle_scope = 'auth'
+
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    # Password checks are deliberately slow; limit guessing per IP address
+    throttle_scope = 'auth'
 
 class UserListView(generics.ListAPIView):
+    """Users from the cached directory; ``?role=agent`` narrows it for assignment pickers."""
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return User.objects.none()
         if self.request.user.is_manager:
             return User.objects.all()
         return User.objects.filter(id=self.request.user.id)
+    
+    def list(self, request, *args, **kwargs):
+        directory = get_directory()
+        if request.user.is_manager:
+            users = directory.users(role=request.query_params.get('role'))
+        else:
+            users = [directory.profile(request.user.id) or UserSerializer(request.user).data]
+        page = self.paginate_queryset(users)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(users)
 
 class UserDetailView(generics.RetrieveUpdateAPIView):
     queryset = User.objects.all()
@@ -60,6 +86,47 @@ class CurrentUserView(APIView):
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
 
+class ProfilePictureView(APIView):
+    """
+    Store an uploaded profile picture and return at once.
+    
+    The upload is streamed to storage as is; thumbnails, dimensions and
+    metadata stripping happen in ``process_profile_picture``.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def put(self, request):
+        serializer = ProfilePictureSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        user = request.user
+        previous = user.profile_picture.name if user.profile_picture else None
+        upload = serializer.validated_data['profile_picture']
+        with transaction.atomic():
+            user.profile_picture.save(upload.name, upload, save=False)
+            user.save(update_fields=['profile_picture'])
+            name = user.profile_picture.name
+            transaction.on_commit(lambda: process_profile_picture.delay(user.pk, name))
+        if previous:
+            user.profile_picture.storage.delete(previous)
+        return Response(UserSerializer(user).data, status=status.HTTP_202_ACCEPTED)
+    
+    def delete(self, request):
+        user = request.user
+        variants = user.profile_picture_variants
+        if user.profile_picture:
+            user.profile_picture.delete(save=False)
+        user.profile_picture = None
+        user.profile_picture_width = user.profile_picture_height = None
+        user.profile_picture_variants = {}
+        user.save(update_fields=[
+            'profile_picture', 'profile_picture_width', 'profile_picture_height', 'profile_picture_variants',
+        ])
+        delete_variants(variants)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class LogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
@@ -69,5 +136,5 @@ class LogoutView(APIView):
             token = RefreshToken(refresh_token)
             token.blacklist()
             return Response(status=status.HTTP_205_RESET_CONTENT)
-        except Exception:
+        except (KeyError, TokenError):
             return Response(status=status.HTTP_400_BAD_REQUEST)
@@ -8,6 +8,9 @@ pip install -r requirements.txt
 echo "Applying database migrations..."
 python manage.py migrate
 
+echo "Building the OpenAPI schema..."
+python manage.py build_openapi_schema
+
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from kombu import Queue
 from celery.schedules import crontab
 from django.conf import settings
 
@@ -29,12 +30,73 @@ app.conf.beat_schedule = {
         'task': 'leads.tasks.update_stale_lead_statuses',
         'schedule': crontab(hour=3, minute=0),  # Run at 3 AM UTC daily
     },
+    'rebuild-agent-lead-counts': {
+        'task': 'leads.tasks.rebuild_agent_lead_counts',
+        'schedule': crontab(hour=2, minute=0),  # Run at 2 AM UTC daily
+    },
+    'refresh-duplicate-keys': {
+        'task': 'leads.tasks.refresh_duplicate_keys',
+        'schedule': crontab(minute=15),  # Run hourly
+    },
+    'recompute-lead-scores': {
+        'task': 'leads.tasks.recompute_lead_scores',
+        'schedule': crontab(hour=4, minute=0),  # Run at 4 AM UTC daily
+    },
+    'archive-old-history': {
+        'task': 'leads.tasks.archive_old_history',
+        'schedule': crontab(hour=1, minute=0),  # Run at 1 AM UTC daily
+    },
+    'relay-outbox': {
+        'task': 'leads.tasks.relay_outbox',
+        'schedule': crontab(),  # Run every minute, picks up retries and missed events
+    },
+    'prune-webhook-outbox': {
+        'task': 'leads.tasks.prune_webhook_outbox',
+        'schedule': crontab(hour=5, minute=0),  # Run at 5 AM UTC daily
+    },
+    'prune-token-blacklist': {
+        'task': 'accounts.tasks.prune_token_blacklist',
+        'schedule': crontab(minute=45),  # Run hourly, also refreshes the revocation cache
+    },
 }
 
-# Redis connection pool settings for Render
-app.conf.broker_pool_limit = 1
+# Each queue has its own worker: latency-sensitive work (single
+# notifications, cache invalidation) on realtime, scheduled relays and
+# reminders on default, and large imports or nightly jobs on bulk, so a
+# long bulk task never holds up the other two.
+REALTIME_QUEUE = 'realtime'
+DEFAULT_QUEUE = 'default'
+BULK_QUEUE = 'bulk'
+
+app.conf.task_queues = (
+    Queue(REALTIME_QUEUE),
+    Queue(DEFAULT_QUEUE),
+    Queue(BULK_QUEUE),
+)
+app.conf.task_default_queue = DEFAULT_QUEUE
+app.conf.task_routes = {
+    'leads.tasks.send_reminder_email': {'queue': REALTIME_QUEUE},
+    'leads.tasks.send_daily_reminders': {'queue': DEFAULT_QUEUE},
+    'leads.tasks.assign_unassigned_leads': {'queue': BULK_QUEUE},
+    'leads.tasks.rebuild_agent_lead_counts': {'queue': BULK_QUEUE},
+    'leads.tasks.refresh_duplicate_keys': {'queue': BULK_QUEUE},
+    'leads.tasks.recompute_lead_scores': {'queue': BULK_QUEUE},
+    'leads.tasks.archive_old_history': {'queue': BULK_QUEUE},
+    'leads.tasks.relay_outbox': {'queue': DEFAULT_QUEUE},
+    'leads.tasks.prune_webhook_outbox': {'queue': BULK_QUEUE},
+    'accounts.tasks.prune_token_blacklist': {'queue': BULK_QUEUE},
+    'accounts.tasks.process_profile_picture': {'queue': DEFAULT_QUEUE},
+}
+
+# Idempotent tasks set acks_late so a recycled worker hands them back
+# instead of dropping them; email sends and webhook relays are acknowledged
+# up front so a lost worker never sends them twice.
+app.conf.task_reject_on_worker_lost = True
+
+# Redis connection pool settings for Render (pool size: CELERY_BROKER_POOL_LIMIT)
 app.conf.broker_heartbeat = None
 app.conf.broker_connection_timeout = 30
+# Workers override this per queue, see docker-compose.yml / render.yaml
 app.conf.worker_prefetch_multiplier = 1
 
 @app.task(bind=True)
@@ -0,0 +1,156 @@
+"""
+Content-Encoding negotiation for API responses.
+
+gzip is always available; brotli and zstd are offered when the ``brotli``
+and ``zstandard`` packages are installed.
+"""
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 6
+# Brotli's default of 11 is meant for static assets; 4 compresses better
+# than gzip at about the same speed.
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+# Media types worth compressing. HTML is left out: the browsable API and
+# admin pages carry a CSRF token next to reflected input (BREACH).
+COMPRESSIBLE_TYPES = frozenset({
+    'application/json',
+    'application/msgpack',
+    'application/javascript',
+    'application/xml',
+    'application/yaml',
+    'text/csv',
+    'text/plain',
+})
+
+
+class _GzipStream:
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _ZstdStream:
+
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+def _gzip(data):
+    # mtime=0 keeps the output, and so cache validators, stable
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def _zstd(data):
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+# Encoding name -> (compress bytes, streaming compressor class)
+CODECS = {'gzip': (_gzip, _GzipStream)}
+if brotli is not None:
+    CODECS['br'] = (_brotli, _BrotliStream)
+if zstandard is not None:
+    CODECS['zstd'] = (_zstd, _ZstdStream)
+
+
+def parse_accept_encoding(header):
+    """``{'gzip': 1.0, 'br': 0.5, ...}`` from an Accept-Encoding header."""
+    weights = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def negotiate(header, preference):
+    """
+    The encoding to use for a request, or None to send the body as is.
+
+    The client's highest q-value wins; ties go to the first of
+    ``preference``. Encodings whose package is missing are skipped.
+    """
+    if not header:
+        return None
+    weights = parse_accept_encoding(header)
+    wildcard = weights.get('*', 0.0)
+    best, best_weight = None, 0.0
+    for coding in preference:
+        if coding not in CODECS:
+            continue
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def is_compressible(content_type):
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return (
+        media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith('+json')
+        or media_type.endswith('+xml')
+    )
+
+
+def compress(coding, data):
+    return CODECS[coding][0](data)
+
+
+def compress_stream(coding, chunks):
+    compressor = CODECS[coding][1]()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
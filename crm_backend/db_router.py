@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+_use_replica = ContextVar('use_replica', default=False)
+
+_health = {'checked_at': 0.0, 'available': False}
+_health_lock = threading.Lock()
+
+# Seconds the replica is behind the primary; 0 when fully replayed, and
+# also on a server that is not a standby at all.
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def replica_alias():
+    alias = settings.REPLICA_DATABASE_ALIAS
+    return alias if alias in settings.DATABASES else None
+
+
+def _check_replica(alias):
+    try:
+        with connections[alias].cursor() as cursor:
+            if connections[alias].vendor == 'postgresql':
+                cursor.execute(POSTGRES_LAG_SQL)
+                lag = float(cursor.fetchone()[0] or 0)
+            else:
+                cursor.execute('SELECT 1')
+                lag = 0
+    except DatabaseError:
+        logger.warning('Read replica %s is unreachable, reading from primary', alias)
+        return False
+    if lag > settings.REPLICA_MAX_LAG_SECONDS:
+        logger.warning('Read replica %s is %.1fs behind, reading from primary', alias, lag)
+        return False
+    return True
+
+
+def replica_available():
+    """Whether reads may go to the replica; re-checked at most every few seconds per process."""
+    alias = replica_alias()
+    if alias is None:
+        return False
+    now = time.monotonic()
+    if now - _health['checked_at'] >= settings.REPLICA_HEALTH_CHECK_SECONDS:
+        with _health_lock:
+            if now - _health['checked_at'] >= settings.REPLICA_HEALTH_CHECK_SECONDS:
+                _health['available'] = _check_replica(alias)
+                _health['checked_at'] = now
+    return _health['available']
+
+
+def reading_from_replica():
+    """Whether reads are being routed to the replica, without re-checking its health."""
+    return _use_replica.get() and _health['available'] and replica_alias() is not None
+
+
+def mark_replica_unavailable():
+    """Send reads to the primary until the next health check, e.g. after the replica dropped a query."""
+    alias = replica_alias()
+    with _health_lock:
+        _health['available'] = False
+        _health['checked_at'] = time.monotonic()
+    logger.warning('Read replica %s failed a query, reading from primary', alias)
+    try:
+        connections[alias].close()
+    except DatabaseError:
+        pass
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """Route reads inside the block to the replica, e.g. for reporting tasks."""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def _pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    try:
+        cache.set(_pin_key(user_id), 1, settings.REPLICA_PIN_SECONDS)
+    except Exception:
+        logger.warning('Could not record primary pin for user %s', user_id, exc_info=True)
+
+
+def is_pinned_to_primary(user_id):
+    try:
+        return cache.get(_pin_key(user_id)) is not None
+    except Exception:
+        # Without the pin store we cannot promise read-your-writes.
+        return True
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to the replica while ``use_replica`` is active.
+
+    Writes, migrations and anything inside a transaction on the primary
+    always use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if not replica_available():
+            return DEFAULT_DB_ALIAS
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
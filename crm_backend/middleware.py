@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.db import InterfaceError, OperationalError
+from django.utils.cache import patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import compression
+from .db_router import (
+    use_replica, pin_to_primary, is_pinned_to_primary, reading_from_replica, mark_replica_unavailable,
+)
+
+
+def _bearer_user_id(request):
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    parts = header.split()
+    if len(parts) != 2 or parts[0] not in settings.SIMPLE_JWT['AUTH_HEADER_TYPES']:
+        return None
+    try:
+        return AccessToken(parts[1]).get(settings.SIMPLE_JWT['USER_ID_CLAIM'])
+    except TokenError:
+        return None
+
+
+def _request_user_id(request):
+    """The user behind the bearer token or, without one, the session."""
+    user_id = _bearer_user_id(request)
+    if user_id is None and hasattr(request, 'session'):
+        user_id = request.session.get(SESSION_KEY)
+    return user_id
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve safe-method requests from the read replica.
+
+    After a successful write the user is pinned to the primary for
+    REPLICA_PIN_SECONDS, so their next reads see their own changes even
+    if the replica has not caught up yet. A replica that goes away between
+    health checks fails the request's queries; the view is then run once
+    more against the primary instead of returning a 500.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            user = getattr(request, 'user', None)
+            if response.status_code < 400 and user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+            return response
+
+        user_id = _request_user_id(request)
+        readable = user_id is None or not is_pinned_to_primary(user_id)
+        with use_replica(readable):
+            return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, (OperationalError, InterfaceError)) or not reading_from_replica():
+            return None
+        mark_replica_unavailable()
+        match = request.resolver_match
+        with use_replica(False):
+            return match.func(request, *match.args, **match.kwargs)
+
+
+class RateLimitHeadersMiddleware:
+    """Add RateLimit-* headers for the bucket the throttles recorded on the request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit is not None:
+            limit, remaining, reset = rate_limit
+            response['RateLimit-Limit'] = str(limit)
+            response['RateLimit-Remaining'] = str(remaining)
+            response['RateLimit-Reset'] = str(reset)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts.
+
+    Bodies under RESPONSE_COMPRESSION_MIN_BYTES are sent as they are; the
+    headers would cost more than the compression saves. Static files never
+    get here: WhiteNoise answers those first with precompressed copies.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_bytes = settings.RESPONSE_COMPRESSION_MIN_BYTES
+        self.preference = settings.RESPONSE_COMPRESSION_ENCODINGS
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding') or response.status_code in (204, 304):
+            return response
+        if not compression.is_compressible(response.get('Content-Type', '')):
+            return response
+        if not response.streaming and len(response.content) < self.min_bytes:
+            return response
+
+        # The body depends on Accept-Encoding whether or not we compress it
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = compression.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.preference)
+        if coding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(coding, response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = compression.compress(coding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The bytes changed, so a strong validator no longer holds
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,76 @@
+"""
+API documentation views.
+
+The schema is generated once by ``manage.py build_openapi_schema`` during
+the build and collected as a static file, so WhiteNoise serves it
+compressed and with an ETag. drf_yasg's views and generators are only
+imported when a docs page is requested, or when no precomputed schema
+exists and the schema is generated live; the package itself is loaded
+at startup as an installed app, for its templates and UI assets.
+"""
+from functools import lru_cache
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.shortcuts import redirect
+
+SCHEMA_FILES = {
+    '.json': 'openapi/swagger.json',
+    '.yaml': 'openapi/swagger.yaml',
+}
+
+
+def api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="CRM Backend API",
+        default_version='v1',
+        description="API for CRM system with Vue.js frontend integration",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="contact@crm.local"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_schema_view():
+    from drf_yasg.views import get_schema_view as build_schema_view
+    from rest_framework import permissions
+
+    return build_schema_view(
+        api_info(),
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+    )
+
+
+@lru_cache(maxsize=None)
+def precomputed_schema_url(format):
+    name = SCHEMA_FILES[format]
+    try:
+        if staticfiles_storage.exists(name):
+            return staticfiles_storage.url(name)
+    except ValueError:
+        # Built, but collected before the schema existed
+        pass
+    return None
+
+
+@lru_cache(maxsize=None)
+def _ui_view(renderer):
+    return get_schema_view().with_ui(renderer, cache_timeout=0)
+
+
+def schema(request, format):
+    url = precomputed_schema_url(format)
+    if url is not None:
+        return redirect(url)
+    return get_schema_view().without_ui(cache_timeout=0)(request, format=format)
+
+
+def swagger_ui(request):
+    return _ui_view('swagger')(request)
+
+
+def redoc(request):
+    return _ui_view('redoc')(request)
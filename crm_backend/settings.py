@@ -1,5 +1,6 @@
 import os
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 from decouple import config, Csv
 import dj_database_url
@@ -26,6 +27,7 @@ INSTALLED_APPS = [
     
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'django_filters',
     'drf_yasg',
@@ -38,11 +40,14 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'crm_backend.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'crm_backend.middleware.ReplicaRoutingMiddleware',
+    'crm_backend.middleware.RateLimitHeadersMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'auditlog.middleware.AuditlogMiddleware',
@@ -75,6 +80,18 @@ DATABASES = {
     )
 }
 
+# Optional read replica; safe-method requests and reporting tasks read from it
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', default='')
+REPLICA_DATABASE_ALIAS = 'replica'
+if DATABASE_REPLICA_URL:
+    DATABASES[REPLICA_DATABASE_ALIAS] = dj_database_url.parse(DATABASE_REPLICA_URL, conn_max_age=600)
+    DATABASES[REPLICA_DATABASE_ALIAS]['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['crm_backend.db_router.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=15, cast=int)
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=5, cast=int)
+REPLICA_HEALTH_CHECK_SECONDS = config('REPLICA_HEALTH_CHECK_SECONDS', default=5, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -89,6 +106,9 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# build_openapi_schema writes here; collected as static/openapi/ once built
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'openapi'
+STATICFILES_DIRS = [('openapi', OPENAPI_SCHEMA_DIR)] if OPENAPI_SCHEMA_DIR.is_dir() else []
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -107,10 +127,44 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'leads.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    'DEFAULT_THROTTLE_CLASSES': (
+        'crm_backend.throttling.UserTokenBucketThrottle',
+        'crm_backend.throttling.AnonTokenBucketThrottle',
+        'crm_backend.throttling.ScopedTokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'user': config('THROTTLE_RATE_USER', default='600/min'),
+        'anon': config('THROTTLE_RATE_ANON', default='60/min'),
+        'search': config('THROTTLE_RATE_SEARCH', default='60/min'),
+        'export': config('THROTTLE_RATE_EXPORT', default='10/min'),
+        'bulk': config('THROTTLE_RATE_BULK', default='20/min'),
+        'auth': config('THROTTLE_RATE_AUTH', default='10/min'),
+    },
+    # Proxies in front of gunicorn; per-IP limits read the client from X-Forwarded-For past them
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
+# MessagePack is offered alongside JSON when the msgpack package is installed
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] += ('leads.renderers.MessagePackRenderer',)
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = (
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'leads.parsers.MessagePackParser',
+    )
+
+# Responses at least this large are compressed; the order breaks ties between
+# encodings the client accepts equally (br and zstd need their packages)
+RESPONSE_COMPRESSION_MIN_BYTES = config('RESPONSE_COMPRESSION_MIN_BYTES', default=1024, cast=int)
+RESPONSE_COMPRESSION_ENCODINGS = config('RESPONSE_COMPRESSION_ENCODINGS', default='zstd,br,gzip', cast=Csv())
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('JWT_ACCESS_TOKEN_LIFETIME', default=60, cast=int)),
     'REFRESH_TOKEN_LIFETIME': timedelta(minutes=config('JWT_REFRESH_TOKEN_LIFETIME', default=1440, cast=int)),
@@ -123,6 +177,7 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.tokens.TokenRefreshSerializer',
 }
 
 # CORS Settings for Vercel Frontend
@@ -148,15 +203,61 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
 ]
+CORS_EXPOSE_HEADERS = ['ratelimit-limit', 'ratelimit-remaining', 'ratelimit-reset', 'retry-after']
 
 REDIS_URL = config('REDIS_URL', default='redis://localhost:6379')
 
+CACHE_URL = config('CACHE_URL', default=REDIS_URL)
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Token buckets for the API throttles; a non-Redis URL keeps them in process
+THROTTLE_REDIS_URL = config('THROTTLE_REDIS_URL', default=REDIS_URL)
+THROTTLE_REDIS_TIMEOUT = config('THROTTLE_REDIS_TIMEOUT', default=0.1, cast=float)
+# After a Redis error, count in process for this long before trying Redis again
+THROTTLE_REDIS_RETRY_SECONDS = config('THROTTLE_REDIS_RETRY_SECONDS', default=30, cast=int)
+
+# Revoked refresh tokens; a non-Redis URL keeps them in process
+TOKEN_REVOCATION_REDIS_URL = config('TOKEN_REVOCATION_REDIS_URL', default=REDIS_URL)
+TOKEN_REVOCATION_REDIS_TIMEOUT = config('TOKEN_REVOCATION_REDIS_TIMEOUT', default=0.5, cast=float)
+
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Results expire instead of accumulating in Redis; fire-and-forget tasks set ignore_result
+CELERY_RESULT_EXPIRES = config('CELERY_RESULT_EXPIRES', default=60 * 60 * 24, cast=int)
+CELERY_BROKER_POOL_LIMIT = config('CELERY_BROKER_POOL_LIMIT', default=10, cast=int)
+
+# Lead routing: '', 'round_robin', 'least_loaded' or 'territory'
+LEAD_ASSIGNMENT_STRATEGY = config('LEAD_ASSIGNMENT_STRATEGY', default='')
+
+# Notes and correspondence older than this move to the compressed archive tables
+NOTE_ARCHIVE_AFTER_DAYS = config('NOTE_ARCHIVE_AFTER_DAYS', default=365, cast=int)
+CORRESPONDENCE_ARCHIVE_AFTER_DAYS = config('CORRESPONDENCE_ARCHIVE_AFTER_DAYS', default=365, cast=int)
+
+# Outgoing webhooks: failed deliveries retry with exponential backoff
+WEBHOOK_TIMEOUT_SECONDS = config('WEBHOOK_TIMEOUT_SECONDS', default=10, cast=int)
+WEBHOOK_MAX_ATTEMPTS = config('WEBHOOK_MAX_ATTEMPTS', default=8, cast=int)
+WEBHOOK_RETRY_BASE_SECONDS = config('WEBHOOK_RETRY_BASE_SECONDS', default=30, cast=int)
+WEBHOOK_RETRY_MAX_SECONDS = config('WEBHOOK_RETRY_MAX_SECONDS', default=60 * 60 * 6, cast=int)
+WEBHOOK_BATCH_SIZE = config('WEBHOOK_BATCH_SIZE', default=200, cast=int)
+WEBHOOK_MAX_WORKERS = config('WEBHOOK_MAX_WORKERS', default=16, cast=int)
+# Requests per connection slot an endpoint gets in one relay batch
+WEBHOOK_ENDPOINT_ROUNDS = config('WEBHOOK_ENDPOINT_ROUNDS', default=5, cast=int)
 
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@crmapp.com')
@@ -181,7 +282,18 @@ SWAGGER_SETTINGS = {
         }
     },
     'USE_SESSION_AUTH': False,
+    # The UI loads the precomputed schema instead of regenerating it
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Profile picture uploads; thumbnails in these square sizes are built in the background
+PROFILE_PICTURE_MAX_BYTES = config('PROFILE_PICTURE_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+PROFILE_PICTURE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'webp', 'gif')
+AVATAR_SIZES = (64, 256)
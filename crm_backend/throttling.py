@@ -0,0 +1,211 @@
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+# Refill the bucket for the time since the last call, then take ``cost``
+# tokens if there are enough. One round trip, atomic inside Redis.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisTokenBucket:
+    """
+    Buckets shared by every process through Redis.
+
+    After a Redis error the store is skipped for THROTTLE_REDIS_RETRY_SECONDS
+    and requests are counted in process instead, so an outage costs one
+    timeout per process rather than one per throttle on every request.
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(
+            url,
+            socket_timeout=settings.THROTTLE_REDIS_TIMEOUT,
+            socket_connect_timeout=settings.THROTTLE_REDIS_TIMEOUT,
+        )
+        self.script = self.client.register_script(TOKEN_BUCKET_LUA)
+        self.errors = redis.RedisError
+        self.fallback = LocalTokenBucket()
+        self.retry_at = 0.0
+
+    def take(self, key, capacity, rate, cost=1):
+        if time.monotonic() < self.retry_at:
+            return self.fallback.take(key, capacity, rate, cost)
+        try:
+            allowed, tokens = self.script(keys=[key], args=[capacity, rate, time.time(), cost])
+        except self.errors:
+            self.retry_at = time.monotonic() + settings.THROTTLE_REDIS_RETRY_SECONDS
+            logger.warning(
+                'Rate limit store unavailable, counting in process for %ss',
+                settings.THROTTLE_REDIS_RETRY_SECONDS, exc_info=True,
+            )
+            return self.fallback.take(key, capacity, rate, cost)
+        return bool(allowed), float(tokens)
+
+
+class LocalTokenBucket:
+    """In-process buckets, for development and tests and while Redis is unreachable."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        now = time.time()
+        with self.lock:
+            tokens, ts = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0, now - ts) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.buckets[key] = (tokens, now)
+        return allowed, tokens
+
+
+_bucket = None
+_bucket_lock = threading.Lock()
+
+
+def get_bucket():
+    global _bucket
+    if _bucket is None:
+        with _bucket_lock:
+            if _bucket is None:
+                url = settings.THROTTLE_REDIS_URL
+                if url.startswith(('redis://', 'rediss://')):
+                    _bucket = RedisTokenBucket(url)
+                else:
+                    _bucket = LocalTokenBucket()
+    return _bucket
+
+
+def parse_rate(rate):
+    """``'100/min'`` -> ``(100, 60)``, the same format as DRF's rate throttles."""
+    num, period = rate.split('/')
+    duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+    return int(num), duration
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per scope and client, refilled continuously at the scope's rate.
+
+    The rate's request count is also the burst size. Subclasses pick the
+    scope and the client key; ``None`` from either skips the throttle.
+    If the bucket store fails outright requests are let through rather than failed.
+    """
+    scope = None
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def get_ident_key(self, request):
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        ident = self.get_ident_key(request) if rate else None
+        if ident is None:
+            return True
+
+        capacity, duration = parse_rate(rate)
+        refill = capacity / duration
+        try:
+            allowed, tokens = get_bucket().take(f"throttle:{scope}:{ident}", capacity, refill)
+        except Exception:
+            logger.warning('Rate limit store unavailable, not throttling', exc_info=True)
+            return True
+
+        self.wait_seconds = 0 if allowed else (1 - tokens) / refill
+        self.record(request, capacity, tokens, math.ceil((capacity - tokens) / refill))
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+    @staticmethod
+    def record(request, limit, tokens, reset):
+        # Keep the tightest bucket for the RateLimit-* headers; stored on the
+        # Django request so RateLimitHeadersMiddleware can see it.
+        remaining = max(int(tokens), 0)
+        current = getattr(request._request, 'rate_limit', None)
+        if current is None or remaining < current[1]:
+            request._request.rate_limit = (limit, remaining, reset)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """General limit for authenticated users, per user."""
+    scope = 'user'
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """General limit for anonymous clients, per IP address."""
+    scope = 'anon'
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Tighter limits for expensive requests.
+
+    The scope is the view's ``throttle_scope``, else the entry for the
+    current action in ``throttle_action_scopes``, else ``'search'`` for a
+    list request with a search term. Keyed per user, or per IP address
+    when anonymous.
+    """
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        action = getattr(view, 'action', None)
+        scope = getattr(view, 'throttle_action_scopes', {}).get(action)
+        if scope:
+            return scope
+        if action == 'list' and request.query_params.get(api_settings.SEARCH_PARAM):
+            return 'search'
+        return None
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
@@ -0,0 +1,26 @@
+from django.contrib import admin
+from .models import AgentLoad, WebhookEndpoint, WebhookDelivery
+
+class AgentLoadAdmin(admin.ModelAdmin):
+    """Territory and weight of each agent, read by the ``territory`` assignment strategy."""
+    list_display = ('agent', 'country', 'state', 'weight', 'open_leads', 'last_assigned_at')
+    list_editable = ('country', 'state', 'weight')
+    list_filter = ('country',)
+    search_fields = ('agent__email', 'agent__first_name', 'agent__last_name', 'country', 'state')
+    raw_id_fields = ('agent',)
+    # Maintained by assignment and rebuilt nightly
+    readonly_fields = ('open_leads', 'last_assigned_at')
+
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ('name', 'url', 'events', 'max_concurrency', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'url')
+
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('event', 'endpoint', 'status', 'attempts', 'next_attempt_at', 'delivered_at')
+    list_filter = ('status', 'endpoint')
+    raw_id_fields = ('event',)
+
+admin.site.register(AgentLoad, AgentLoadAdmin)
+admin.site.register(WebhookEndpoint, WebhookEndpointAdmin)
+admin.site.register(WebhookDelivery, WebhookDeliveryAdmin)
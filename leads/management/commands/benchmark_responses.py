@@ -0,0 +1,73 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from crm_backend import compression
+from crm_backend.middleware import CompressionMiddleware
+from leads.renderers import MessagePackRenderer
+from leads.views import LeadViewSet, ContactViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Measures bytes on the wire and CPU per request for the list endpoints in each format and encoding'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of the user to list as; defaults to the first manager')
+        parser.add_argument('--repeat', type=int, default=50)
+    
+    def _get_user(self, email):
+        users = User.objects.filter(email=email) if email else User.objects.filter(role=User.Role.MANAGER)
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError(f'No user {email}' if email else 'No manager to list as')
+        return user
+    
+    def _measure(self, handler, request, repeat):
+        """Response and mean CPU seconds for rendering and compressing it."""
+        started = time.process_time()
+        for _ in range(repeat):
+            response = handler(request)
+        return response, (time.process_time() - started) / repeat
+    
+    def handle(self, *args, **options):
+        user = self._get_user(options['user'])
+        repeat = options['repeat']
+        factory = APIRequestFactory()
+        
+        accepts = [('json', 'application/json')]
+        if MessagePackRenderer in api_settings.DEFAULT_RENDERER_CLASSES:
+            accepts.append(('msgpack', MessagePackRenderer.media_type))
+        else:
+            self.stdout.write(self.style.WARNING('MessagePackRenderer is not enabled, skipping MessagePack'))
+        codings = ['identity'] + [coding for coding in ('gzip', 'br', 'zstd') if coding in compression.CODECS]
+        
+        for name, viewset in (('leads', LeadViewSet), ('contacts', ContactViewSet)):
+            # Throttling would stop the benchmark long before it is done
+            view = viewset.as_view({'get': 'list'}, throttle_classes=())
+            handler = CompressionMiddleware(lambda request: view(request).render())
+        
+            raw_size = None
+            for format_name, accept in accepts:
+                for coding in codings:
+                    request = factory.get(f'/api/{name}/', HTTP_ACCEPT=accept, HTTP_ACCEPT_ENCODING=coding)
+                    force_authenticate(request, user=user)
+                    response, cpu = self._measure(handler, request, repeat)
+                    if response.status_code != 200:
+                        raise CommandError(f'{name} list returned {response.status_code}')
+                    if response.get('Content-Encoding', 'identity') != coding:
+                        # Under RESPONSE_COMPRESSION_MIN_BYTES, or no smaller compressed
+                        self.stdout.write(self.style.WARNING(f'{name} {format_name} sent without {coding}'))
+                        continue
+            
+                    size = len(response.content)
+                    raw_size = raw_size or size
+                    self.stdout.write(
+                        f'{name} {format_name} {coding}: {size:,} bytes '
+                        f'({size / raw_size:.0%} of raw JSON), '
+                        f'{cpu * 1000:.2f} ms CPU/request'
+                    )
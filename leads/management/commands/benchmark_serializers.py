@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from leads.models import Lead, Contact
+from leads.renderers import ORJSONRenderer
+from leads.serializers import LeadSerializer, ContactSerializer
+from leads.utils.fast_serialization import lead_rows, contact_rows
+
+
+class Command(BaseCommand):
+    help = 'Compares the list fast path with the ModelSerializer output and timing'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+    
+    def _best(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return output, best
+    
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        
+        for name, model, serializer_class, fast_rows in (
+            ('leads', Lead, LeadSerializer, lead_rows),
+            ('contacts', Contact, ContactSerializer, contact_rows),
+        ):
+            queryset = model.objects.all()[:rows]
+            ids = list(queryset.values_list('pk', flat=True))
+            if not ids:
+                self.stdout.write(self.style.WARNING(f'No {name} to benchmark'))
+                continue
+            
+            slow, slow_time = self._best(
+                lambda: JSONRenderer().render(serializer_class(queryset, many=True).data), repeat
+            )
+            fast, fast_time = self._best(
+                lambda: ORJSONRenderer().render(fast_rows.serialize_ids(ids)), repeat
+            )
+            if slow != fast:
+                raise CommandError(f'Fast path output for {name} differs from {serializer_class.__name__}')
+            
+            per_thousand = 1000 / len(ids)
+            self.stdout.write(
+                f'{name}: {len(ids)} rows, '
+                f'serializer {slow_time * per_thousand * 1000:.1f} ms/1k rows, '
+                f'fast path {fast_time * per_thousand * 1000:.1f} ms/1k rows, '
+                f'{slow_time / fast_time:.1f}x faster, output identical'
+            )
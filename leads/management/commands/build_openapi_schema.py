@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from crm_backend.openapi import SCHEMA_FILES, api_info
+
+
+class Command(BaseCommand):
+    help = 'Writes the OpenAPI schema to OPENAPI_SCHEMA_DIR for collectstatic to pick up'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='', help='Absolute API URL to put in the schema; relative when empty')
+    
+    def handle(self, *args, **options):
+        from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+        from drf_yasg.generators import OpenAPISchemaGenerator
+        
+        generator = OpenAPISchemaGenerator(api_info(), url=options['url'] or None)
+        schema = generator.get_schema(request=None, public=True)
+        
+        output_dir = settings.OPENAPI_SCHEMA_DIR
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for format, codec in (('.json', OpenAPICodecJson), ('.yaml', OpenAPICodecYaml)):
+            path = output_dir / SCHEMA_FILES[format].split('/', 1)[1]
+            path.write_bytes(codec(validators=[]).encode(schema))
+            self.stdout.write(f'Wrote {path}')
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Each target is run in a fresh interpreter, the way the process starts in production
+TARGETS = {
+    'manage': ['manage.py', 'check'],
+    'wsgi': [
+        '-c',
+        'import crm_backend.wsgi; from django.urls import get_resolver; get_resolver().url_patterns',
+    ],
+    'celery': [
+        '-c',
+        'import django; django.setup(); from crm_backend.celery import app; app.loader.import_default_modules()',
+    ],
+}
+
+
+def parse_importtime(output):
+    """``(module, self_us, cumulative_us)`` rows from ``python -X importtime`` output."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Profiles module import time of manage.py, the WSGI app and the Celery worker'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f"Any of {', '.join(TARGETS)}; all by default")
+        parser.add_argument('--top', type=int, default=15)
+    
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'crm_backend.settings')}
+        unknown = set(options['targets']) - set(TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown targets: {', '.join(sorted(unknown))}")
+        
+        for target in options['targets'] or TARGETS:
+            started = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-X', 'importtime', *TARGETS[target]],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            if result.returncode:
+                raise CommandError(f'{target} failed to start:\n{result.stderr[-2000:]}')
+            
+            rows = parse_importtime(result.stderr)
+            by_package = Counter()
+            for name, self_us, _ in rows:
+                by_package[name.split('.')[0]] += self_us
+            
+            total = sum(self_us for _, self_us, _ in rows) / 1000
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{target}: {elapsed:.0f} ms wall, {total:.0f} ms importing {len(rows)} modules'
+            ))
+            for package, self_us in by_package.most_common(options['top']):
+                self.stdout.write(f'  {self_us / 1000:8.1f} ms  {package}')
@@ -1,11 +1,78 @@
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from auditlog.registry import auditlog
 from auditlog.models import AuditlogHistoryField
+from .utils.matching import email_key, phone_key, name_key
 import uuid
+import zlib
 
-class Lead(models.Model):
+class DedupeKeysMixin(models.Model):
+    email_key = models.CharField(max_length=254, blank=True, db_index=True, editable=False)
+    phone_key = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
+    name_key = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    # Set whenever the keys may have changed; cleared by the background dedupe scan
+    dedupe_pending = models.BooleanField(default=True, db_index=True, editable=False)
+    # Smallest pk of the duplicate cluster the scan last placed this row in
+    duplicate_group = models.CharField(max_length=36, blank=True, db_index=True, editable=False)
+    
+    DEDUPE_KEY_FIELDS = ('email_key', 'phone_key', 'name_key')
+    DEDUPE_SOURCE_FIELDS = frozenset({'email', 'phone', 'first_name', 'last_name', 'company'})
+    DEDUPE_STATE_FIELDS = ('dedupe_pending', 'duplicate_group')
+    
+    class Meta:
+        abstract = True
+    
+    def dedupe_keys(self):
+        return tuple(getattr(self, key) for key in self.DEDUPE_KEY_FIELDS)
+    
+    def set_dedupe_keys(self):
+        self.email_key = email_key(self.email)
+        self.phone_key = phone_key(self.phone)
+        self.name_key = name_key(self.first_name, self.last_name, self.company)
+    
+    def save(self, *args, **kwargs):
+        before = self.dedupe_keys()
+        self.set_dedupe_keys()
+        changed = self._state.adding or before != self.dedupe_keys()
+        if changed:
+            self.dedupe_pending = True
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.DEDUPE_KEY_FIELDS)
+            if changed:
+                kwargs['update_fields'].add('dedupe_pending')
+        super().save(*args, **kwargs)
+
+class DedupeKeysQuerySet(models.QuerySet):
+    """Flags rows for the dedupe scan when a bulk write touches the fields the keys come from."""
+    
+    def update(self, **kwargs):
+        if self.model.DEDUPE_SOURCE_FIELDS.intersection(kwargs):
+            kwargs.setdefault('dedupe_pending', True)
+        return super().update(**kwargs)
+    
+    def bulk_update(self, objs, fields, batch_size=None):
+        if self.model.DEDUPE_SOURCE_FIELDS.intersection(fields):
+            for obj in objs:
+                obj.dedupe_pending = True
+            fields = [*fields, 'dedupe_pending']
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+class LeadQuerySet(DedupeKeysQuerySet):
+    def visible_to(self, user):
+        if user.is_manager:
+            return self
+        return self.filter(models.Q(assigned_to=user) | models.Q(created_by=user))
+
+class ContactQuerySet(DedupeKeysQuerySet):
+    def visible_to(self, user):
+        if user.is_manager:
+            return self
+        return self.filter(created_by=user)
+
+class Lead(DedupeKeysMixin):
     STATUS_CHOICES = (
         ('new', 'New'),
         ('contacted', 'Contacted'),
@@ -16,6 +83,8 @@ class Lead(models.Model):
         ('closed_lost', 'Closed Lost'),
     )
     
+    CLOSED_STATUSES = ('closed_won', 'closed_lost')
+    
     PRIORITY_CHOICES = (
         ('low', 'Low'),
         ('medium', 'Medium'),
@@ -44,6 +113,7 @@ class Lead(models.Model):
     )
     
     value = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    score = models.FloatField(default=0, db_index=True, editable=False)
     
     address = models.TextField(blank=True)
     city = models.CharField(max_length=100, blank=True)
@@ -64,7 +134,9 @@ class Lead(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     last_contacted = models.DateTimeField(null=True, blank=True)
     
-    history = AuditlogHistoryField()
+    history = AuditlogHistoryField(pk_indexable=False)
+    
+    objects = LeadQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
@@ -72,7 +144,7 @@ class Lead(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
-class Contact(models.Model):
+class Contact(DedupeKeysMixin):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
@@ -101,7 +173,9 @@ class Contact(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
-    history = AuditlogHistoryField()
+    history = AuditlogHistoryField(pk_indexable=False)
+    
+    objects = ContactQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
@@ -124,6 +198,9 @@ class Note(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['lead', '-created_at']),
+        ]
     
     def __str__(self):
         return f"Note for {self.lead}"
@@ -157,6 +234,10 @@ class Correspondence(models.Model):
     
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['lead', '-date']),
+        ]
     
     def __str__(self):
         return f"{self.type} with {self.contact}"
@@ -187,9 +268,166 @@ class Reminder(models.Model):
     
     class Meta:
         ordering = ['due_date']
+        indexes = [
+            models.Index(fields=['lead', '-created_at']),
+        ]
     
     def __str__(self):
         return f"Reminder: {self.title}"
 
-auditlog.register(Lead)
-auditlog.register(Contact)
+class AgentLoad(models.Model):
+    agent = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='lead_load'
+    )
+    open_leads = models.PositiveIntegerField(default=0)
+    weight = models.PositiveSmallIntegerField(default=1)
+    
+    country = models.CharField(max_length=100, blank=True)
+    state = models.CharField(max_length=100, blank=True)
+    
+    last_assigned_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['open_leads']
+        indexes = [
+            models.Index(fields=['country', 'state']),
+        ]
+    
+    def __str__(self):
+        return f"{self.agent}: {self.open_leads} open leads"
+
+class CompressedContentMixin(models.Model):
+    content_compressed = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        abstract = True
+    
+    @property
+    def content(self):
+        return zlib.decompress(self.content_compressed).decode('utf-8')
+    
+    @content.setter
+    def content(self, value):
+        self.content_compressed = zlib.compress(value.encode('utf-8'))
+
+class ArchivedNote(CompressedContentMixin):
+    id = models.UUIDField(primary_key=True, editable=False)
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='archived_notes')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['lead', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Archived note for {self.lead}"
+
+class ArchivedCorrespondence(CompressedContentMixin):
+    id = models.UUIDField(primary_key=True, editable=False)
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='archived_correspondence')
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='archived_correspondence', null=True, blank=True)
+    
+    type = models.CharField(max_length=20, choices=Correspondence.CORRESPONDENCE_TYPE_CHOICES)
+    subject = models.CharField(max_length=200, blank=True)
+    date = models.DateTimeField()
+    
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['lead', '-date']),
+        ]
+    
+    def __str__(self):
+        return f"Archived {self.type} with {self.contact}"
+
+class WebhookEndpoint(models.Model):
+    name = models.CharField(max_length=100)
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=128)
+    # Comma separated event types, or '*' for all of them
+    events = models.CharField(max_length=500, default='*')
+    max_concurrency = models.PositiveSmallIntegerField(default=4)
+    is_active = models.BooleanField(default=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return self.name
+    
+    def subscribes_to(self, event_type):
+        events = {event.strip() for event in self.events.split(',')}
+        return '*' in events or event_type in events
+
+class OutboxEvent(models.Model):
+    event_type = models.CharField(max_length=50)
+    object_id = models.CharField(max_length=64)
+    # Events sharing a key replace each other until they are delivered
+    coalesce_key = models.CharField(max_length=120, blank=True, db_index=True)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['dispatched_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} {self.object_id}"
+
+class WebhookDelivery(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('delivered', 'Delivered'),
+        ('superseded', 'Superseded'),
+        ('failed', 'Failed'),
+    )
+    
+    event = models.ForeignKey(OutboxEvent, on_delete=models.CASCADE, related_name='deliveries')
+    endpoint = models.ForeignKey(WebhookEndpoint, on_delete=models.CASCADE, related_name='deliveries')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['next_attempt_at']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'endpoint'], name='unique_event_endpoint_delivery'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event} -> {self.endpoint} ({self.status})"
+
+auditlog.register(Lead, exclude_fields=[*DedupeKeysMixin.DEDUPE_KEY_FIELDS, *DedupeKeysMixin.DEDUPE_STATE_FIELDS, 'score'])
+auditlog.register(Contact, exclude_fields=[*DedupeKeysMixin.DEDUPE_KEY_FIELDS, *DedupeKeysMixin.DEDUPE_STATE_FIELDS])
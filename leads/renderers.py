@@ -0,0 +1,54 @@
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_fallback = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer producing the same bytes through orjson.
+
+    Datetimes and any type orjson does not know are handed to DRF's own
+    encoder so their formatting is unchanged; indented output (the
+    browsable API, ``; indent=`` in Accept) still goes through ``json``.
+    """
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.ensure_ascii or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_fallback.default, option=self.options)
+        # Match JSONRenderer, which escapes the two line terminators valid in
+        # JSON strings but not in JavaScript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders the JSON document as MessagePack, for clients sending
+    ``Accept: application/msgpack``.
+
+    Only registered when the ``msgpack`` package is installed. Values
+    MessagePack has no type for go through DRF's encoder, so datetimes,
+    decimals and UUIDs arrive as the same strings the JSON carries.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_fallback.default, use_bin_type=True)
@@ -1,16 +1,11 @@
 from rest_framework import serializers
-from django.contrib.auth import get_user_model
 from .models import Lead, Contact, Note, Correspondence, Reminder
-
-User = get_user_model()
-
-class UserSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = User
-        fields = ['id', 'email', 'username', 'first_name', 'last_name', 'role']
+from .utils.assignment import STRATEGY_CHOICES, LEAST_LOADED
+from .utils.linking import link, set_contact_leads
+from accounts.serializers import UserSummaryField, DirectoryUserField
 
 class NoteSerializer(serializers.ModelSerializer):
-    created_by = UserSerializer(read_only=True)
+    created_by = UserSummaryField(source='created_by_id')
     
     class Meta:
         model = Note
@@ -18,7 +13,7 @@ class NoteSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_by', 'created_at', 'updated_at']
 
 class CorrespondenceSerializer(serializers.ModelSerializer):
-    created_by = UserSerializer(read_only=True)
+    created_by = UserSummaryField(source='created_by_id')
     
     class Meta:
         model = Correspondence
@@ -27,7 +22,7 @@ class CorrespondenceSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_by', 'created_at', 'updated_at']
 
 class ReminderSerializer(serializers.ModelSerializer):
-    created_by = UserSerializer(read_only=True)
+    created_by = UserSummaryField(source='created_by_id')
     
     class Meta:
         model = Reminder
@@ -35,9 +30,29 @@ class ReminderSerializer(serializers.ModelSerializer):
                  'priority', 'is_completed', 'created_by', 'created_at', 'updated_at']
         read_only_fields = ['created_by', 'created_at', 'updated_at']
 
+def validate_visible_ids(queryset, ids, request):
+    """Check all ``ids`` exist and are visible to the requesting user in one query."""
+    if request is not None:
+        queryset = queryset.visible_to(request.user)
+    ids = list(dict.fromkeys(ids))
+    found = set(queryset.filter(id__in=ids).values_list('id', flat=True))
+    missing = [str(pk) for pk in ids if pk not in found]
+    if missing:
+        raise serializers.ValidationError(f"Invalid or inaccessible ids: {', '.join(missing)}")
+    return ids
+
+class LeadIdsField(serializers.ListField):
+    child = serializers.UUIDField()
+    
+    def get_attribute(self, instance):
+        return instance
+    
+    def to_representation(self, instance):
+        return [str(pk) for pk in instance.leads.values_list('pk', flat=True)]
+
 class ContactSerializer(serializers.ModelSerializer):
-    leads = serializers.PrimaryKeyRelatedField(many=True, queryset=Lead.objects.all(), required=False)
-    created_by = UserSerializer(read_only=True)
+    leads = LeadIdsField(required=False)
+    created_by = UserSummaryField(source='created_by_id')
     
     class Meta:
         model = Contact
@@ -45,11 +60,37 @@ class ContactSerializer(serializers.ModelSerializer):
                  'job_title', 'leads', 'address', 'city', 'state', 'country',
                  'notes', 'created_by', 'created_at', 'updated_at']
         read_only_fields = ['created_by', 'created_at', 'updated_at']
+    
+    def validate_leads(self, value):
+        value = list(dict.fromkeys(value))
+        linked = set()
+        if self.instance is not None:
+            # Links to leads the user cannot see come back from a GET and are left as they are
+            linked = set(self.instance.leads.values_list('pk', flat=True))
+        new_ids = [pk for pk in value if pk not in linked]
+        validate_visible_ids(Lead.objects.all(), new_ids, self.context.get('request'))
+        return value
+    
+    def create(self, validated_data):
+        lead_ids = validated_data.pop('leads', None)
+        contact = super().create(validated_data)
+        if lead_ids:
+            link([contact.pk], lead_ids)
+        return contact
+    
+    def update(self, instance, validated_data):
+        lead_ids = validated_data.pop('leads', None)
+        contact = super().update(instance, validated_data)
+        if lead_ids is not None:
+            request = self.context.get('request')
+            leads = Lead.objects.visible_to(request.user) if request is not None else None
+            set_contact_leads(contact, lead_ids, leads)
+        return contact
 
 class LeadSerializer(serializers.ModelSerializer):
-    assigned_to = UserSerializer(read_only=True)
-    assigned_to_id = serializers.PrimaryKeyRelatedField(
-        queryset=User.objects.filter(role='agent'),
+    assigned_to = UserSummaryField(source='assigned_to_id')
+    assigned_to_id = DirectoryUserField(
+        role='agent',
         source='assigned_to',
         write_only=True,
         required=False,
@@ -59,14 +100,35 @@ class LeadSerializer(serializers.ModelSerializer):
     notes = NoteSerializer(many=True, read_only=True)
     reminders = ReminderSerializer(many=True, read_only=True)
     correspondence = CorrespondenceSerializer(many=True, read_only=True)
-    created_by = UserSerializer(read_only=True)
+    created_by = UserSummaryField(source='created_by_id')
     
     class Meta:
         model = Lead
         fields = ['id', 'first_name', 'last_name', 'company', 'job_title',
                  'email', 'phone', 'status', 'priority', 'source',
-                 'assigned_to', 'assigned_to_id', 'value', 'address',
+                 'assigned_to', 'assigned_to_id', 'value', 'score', 'address',
                  'city', 'state', 'country', 'postal_code', 'description',
                  'contacts', 'notes', 'reminders', 'correspondence',
                  'created_by', 'created_at', 'updated_at', 'last_contacted']
-        read_only_fields = ['created_by', 'created_at', 'updated_at', 'last_contacted']
+        read_only_fields = ['created_by', 'created_at', 'updated_at', 'last_contacted', 'score']
+
+
+class BulkAssignSerializer(serializers.Serializer):
+    lead_ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    agent_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    strategy = serializers.ChoiceField(choices=STRATEGY_CHOICES, default=LEAST_LOADED)
+
+class MergeSerializer(serializers.Serializer):
+    duplicate_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+class LinkLeadsSerializer(serializers.Serializer):
+    lead_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+    
+    def validate_lead_ids(self, value):
+        return validate_visible_ids(Lead.objects.all(), value, self.context.get('request'))
+
+class LinkContactsSerializer(serializers.Serializer):
+    contact_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+    
+    def validate_contact_ids(self, value):
+        return validate_visible_ids(Contact.objects.all(), value, self.context.get('request'))
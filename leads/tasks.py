@@ -2,10 +2,26 @@ from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
-from .models import Reminder
+from .models import Reminder, Lead, Contact
+from .utils.assignment import assign_leads, rebuild_agent_loads, LEAST_LOADED
+from .utils.dedupe import scan_duplicates
+from .utils.scoring import rescore_all_leads
+from .utils.archive import archive_notes, archive_correspondence
+from .utils.outbox import dispatch_events, prune_outbox
+from .utils.webhooks import deliver_due
+import smtplib
 from datetime import timedelta
+from crm_backend.db_router import use_replica
 
-@shared_task
+@shared_task(
+    ignore_result=True,
+    rate_limit='120/m',
+    soft_time_limit=30,
+    time_limit=60,
+    autoretry_for=(smtplib.SMTPException, ConnectionError),
+    retry_backoff=True,
+    max_retries=5,
+)
 def send_reminder_email(reminder_id):
     try:
         reminder = Reminder.objects.get(id=reminder_id, is_completed=False)
@@ -34,15 +50,63 @@ def send_reminder_email(reminder_id):
     except Reminder.DoesNotExist:
         return f"Reminder {reminder_id} not found or already completed"
 
-@shared_task
+@shared_task(soft_time_limit=120, time_limit=180)
 def send_daily_reminders():
     tomorrow = timezone.now() + timedelta(days=1)
-    reminders = Reminder.objects.filter(
-        due_date__date=tomorrow.date(),
-        is_completed=False
-    )
+    with use_replica():
+        reminder_ids = list(Reminder.objects.filter(
+            due_date__date=tomorrow.date(),
+            is_completed=False
+        ).values_list('id', flat=True))
     
-    for reminder in reminders:
-        send_reminder_email.delay(str(reminder.id))
+    for reminder_id in reminder_ids:
+        send_reminder_email.delay(str(reminder_id))
     
-    return f"Sent {len(reminders)} daily reminders"
+    return f"Sent {len(reminder_ids)} daily reminders"
+
+@shared_task(acks_late=True, soft_time_limit=600, time_limit=660)
+def assign_unassigned_leads(strategy=None):
+    strategy = strategy or settings.LEAD_ASSIGNMENT_STRATEGY or LEAST_LOADED
+    leads = Lead.objects.filter(assigned_to__isnull=True).exclude(status__in=Lead.CLOSED_STATUSES)
+    assigned = assign_leads(leads, strategy)
+    return f"Assigned {sum(assigned.values())} leads across {len(assigned)} agents"
+
+@shared_task(acks_late=True, soft_time_limit=300, time_limit=360)
+def rebuild_agent_lead_counts():
+    count = rebuild_agent_loads()
+    return f"Rebuilt lead counters for {count} agents"
+
+@shared_task(acks_late=True, soft_time_limit=900, time_limit=960)
+def refresh_duplicate_keys():
+    leads = scan_duplicates(Lead)
+    contacts = scan_duplicates(Contact)
+    return f"Scanned {leads} changed leads and {contacts} changed contacts for duplicates"
+
+@shared_task(acks_late=True, soft_time_limit=1800, time_limit=1860)
+def recompute_lead_scores(batch_size=2000):
+    count = rescore_all_leads(batch_size=batch_size)
+    return f"Rescored {count} leads"
+
+@shared_task(acks_late=True, soft_time_limit=1800, time_limit=1860)
+def archive_old_history(chunk_size=500):
+    notes = archive_notes(chunk_size=chunk_size)
+    correspondence = archive_correspondence(chunk_size=chunk_size)
+    return f"Archived {notes} notes and {correspondence} correspondence records"
+
+@shared_task(ignore_result=True, soft_time_limit=240, time_limit=300)
+def relay_outbox(max_batches=10):
+    batch_size = settings.WEBHOOK_BATCH_SIZE
+    dispatched = sent = 0
+    for _ in range(max_batches):
+        events = dispatch_events(batch_size)
+        deliveries = deliver_due(batch_size)
+        dispatched += events
+        sent += deliveries
+        if events < batch_size and deliveries < batch_size:
+            break
+    return f"Dispatched {dispatched} events and attempted {sent} webhook deliveries"
+
+@shared_task(acks_late=True, soft_time_limit=600, time_limit=660)
+def prune_webhook_outbox(older_than_days=7):
+    deleted = prune_outbox(older_than_days)
+    return f"Pruned {deleted} delivered outbox events"
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import User
+from .models import Lead, Contact, Note, Correspondence, Reminder, OutboxEvent, WebhookEndpoint, WebhookDelivery
+from .renderers import ORJSONRenderer
+from .serializers import LeadSerializer, ContactSerializer
+from .utils import webhooks
+from .utils.fast_serialization import lead_rows, contact_rows
+from .utils.outbox import dispatch_events
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FastSerializationTests(TestCase):
+    """The list fast path must render byte for byte what the serializers render."""
+
+    @classmethod
+    def setUpTestData(cls):
+        manager = User.objects.create_user(
+            email='manager@example.com', username='manager', password='x', role='manager',
+            first_name='Mary', last_name='Manager',
+        )
+        agent = User.objects.create_user(
+            email='agent@example.com', username='agent', password='x', role='agent',
+        )
+        contacted = datetime(2024, 3, 31, 23, 30, 15, 123456, tzinfo=ZoneInfo('UTC'))
+
+        full = Lead.objects.create(
+            first_name='Ada', last_name='Lovelace', company='Engines Ltd', job_title='CTO',
+            email='ada@example.com', phone='+44 20 7946 0000', status='qualified',
+            priority='high', source='referral', assigned_to=agent, value=Decimal('12345.5'),
+            address='1 Analytical Way', city='London', state='', country='UK',
+            postal_code='N1', description='Unicode   line separator and café',
+            created_by=manager, last_contacted=contacted,
+        )
+        Lead.objects.filter(pk=full.pk).update(score=42.75)
+        # Nulls everywhere the model allows them
+        Lead.objects.create(
+            first_name='Bare', last_name='Minimum', email='bare@example.com',
+            value=None, assigned_to=None, created_by=None, last_contacted=None,
+        )
+
+        contact = Contact.objects.create(
+            first_name='Charles', last_name='Babbage', email='charles@example.com',
+            company='Engines Ltd', created_by=agent,
+        )
+        contact.leads.add(full)
+        Contact.objects.create(first_name='No', last_name='Leads', email='none@example.com')
+
+        Note.objects.create(lead=full, content='First call', created_by=agent)
+        Note.objects.create(lead=full, content='Orphaned author', created_by=None)
+        Reminder.objects.create(
+            lead=full, title='Follow up', description='', due_date=contacted + timedelta(days=3),
+            priority='medium', created_by=agent,
+        )
+        Correspondence.objects.create(
+            contact=contact, lead=full, type='email', subject='Hello', content='Body',
+            date=contacted - timedelta(days=1, microseconds=1), created_by=manager,
+        )
+
+    def assertSameOutput(self, queryset, serializer_class, fast_rows):
+        ids = list(queryset.values_list('pk', flat=True))
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        actual = ORJSONRenderer().render(fast_rows.serialize_ids(ids))
+        self.assertEqual(actual, expected)
+
+    def test_leads_match_serializer(self):
+        self.assertSameOutput(Lead.objects.all(), LeadSerializer, lead_rows)
+
+    def test_contacts_match_serializer(self):
+        self.assertSameOutput(Contact.objects.all(), ContactSerializer, contact_rows)
+
+    @override_settings(TIME_ZONE='Africa/Nairobi')
+    def test_local_time_zone_matches_serializer(self):
+        self.assertSameOutput(Lead.objects.all(), LeadSerializer, lead_rows)
+        self.assertSameOutput(Contact.objects.all(), ContactSerializer, contact_rows)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class WebhookDeliveryTests(TestCase):
+
+    def setUp(self):
+        WebhookEndpoint.objects.create(name='CRM sync', url='http://hooks.example.com/crm', secret='s3cret')
+        self.record_update('pending-1')
+
+    def record_update(self, payload):
+        OutboxEvent.objects.create(
+            event_type='lead.updated', object_id='1', coalesce_key='lead.updated:1', payload={'v': payload},
+        )
+        dispatch_events()
+        return WebhookDelivery.objects.latest('id')
+
+    def deliver_superseding(self, error):
+        """Run deliver_due while a newer update for the same lead arrives mid-send."""
+        delivery = WebhookDelivery.objects.get()
+        real_record = webhooks._record
+        newer = []
+
+        def record(*args):
+            newer.append(self.record_update('pending-2'))
+            real_record(*args)
+
+        with mock.patch.object(webhooks, '_post', return_value=error), \
+                mock.patch.object(webhooks, '_record', side_effect=record):
+            self.assertEqual(webhooks.deliver_due(), 1)
+        delivery.refresh_from_db()
+        return delivery, newer[0]
+
+    def test_failed_send_keeps_superseded_delivery_superseded(self):
+        delivery, newer = self.deliver_superseding('HTTP 503')
+        self.assertEqual(delivery.status, 'superseded')
+        self.assertEqual(newer.status, 'pending')
+        self.assertEqual(
+            list(WebhookDelivery.objects.filter(status='pending').values_list('pk', flat=True)), [newer.pk],
+        )
+
+    def test_successful_send_keeps_superseded_delivery_superseded(self):
+        delivery, _ = self.deliver_superseding(None)
+        self.assertEqual(delivery.status, 'superseded')
+        self.assertIsNone(delivery.delivered_at)
+
+    def test_failed_send_is_retried_later(self):
+        with mock.patch.object(webhooks, '_post', return_value='HTTP 503'):
+            webhooks.deliver_due()
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual(delivery.status, 'pending')
+        self.assertEqual(delivery.attempts, 1)
+        self.assertEqual(delivery.last_error, 'HTTP 503')
+        self.assertGreater(delivery.next_attempt_at, timezone.now())
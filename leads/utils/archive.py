@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Note, Correspondence, ArchivedNote, ArchivedCorrespondence
+
+NOTE_FIELDS = ['id', 'lead_id', 'created_by_id', 'created_at', 'updated_at']
+CORRESPONDENCE_FIELDS = [
+    'id', 'contact_id', 'lead_id', 'type', 'subject', 'date',
+    'created_by_id', 'created_at', 'updated_at',
+]
+
+
+class TieredResults:
+    """
+    Read-only sequence over a hot queryset followed by its archive.
+
+    Supports the ``count()`` and slicing that Django's Paginator needs, so a
+    page that straddles the boundary is filled from both tables while pages
+    entirely on one side only query that side.
+    """
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+        self._first_count = None
+
+    def _count_first(self):
+        if self._first_count is None:
+            self._first_count = self.first.count()
+        return self._first_count
+
+    def count(self):
+        return self._count_first() + self.second.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('TieredResults only supports slicing')
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        boundary = self._count_first()
+
+        items = []
+        if start < boundary:
+            items.extend(self.first[start:min(stop, boundary)])
+        if stop > boundary:
+            items.extend(self.second[max(start - boundary, 0):stop - boundary])
+        return items
+
+
+def _archive(model, archive_model, date_field, fields, cutoff, chunk_size):
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                model.objects.filter(**{f'{date_field}__lt': cutoff})
+                .order_by(date_field)
+                .values(*fields, 'content')[:chunk_size]
+            )
+            if not rows:
+                return total
+            archive_model.objects.bulk_create(
+                [archive_model(**row) for row in rows],
+                ignore_conflicts=True,
+            )
+            model.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        total += len(rows)
+
+
+def archive_notes(older_than_days=None, chunk_size=500):
+    days = older_than_days or settings.NOTE_ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    return _archive(Note, ArchivedNote, 'created_at', NOTE_FIELDS, cutoff, chunk_size)
+
+
+def archive_correspondence(older_than_days=None, chunk_size=500):
+    days = older_than_days or settings.CORRESPONDENCE_ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    return _archive(Correspondence, ArchivedCorrespondence, 'date', CORRESPONDENCE_FIELDS, cutoff, chunk_size)
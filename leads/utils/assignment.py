@@ -0,0 +1,182 @@
+import heapq
+from collections import Counter, defaultdict
+from itertools import cycle
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from ..models import Lead, AgentLoad
+
+User = get_user_model()
+
+ROUND_ROBIN = 'round_robin'
+LEAST_LOADED = 'least_loaded'
+TERRITORY = 'territory'
+
+STRATEGY_CHOICES = (
+    (ROUND_ROBIN, 'Round robin'),
+    (LEAST_LOADED, 'Least open leads'),
+    (TERRITORY, 'Weighted by territory'),
+)
+
+
+def _is_open(status):
+    return status not in Lead.CLOSED_STATUSES
+
+
+def _agent_loads(agent_ids=None):
+    """Return the load counters of active agents, least recently assigned first."""
+    agents = User.objects.filter(role=User.Role.AGENT, is_active=True)
+    if agent_ids is not None:
+        agents = agents.filter(id__in=agent_ids)
+    ids = list(agents.values_list('id', flat=True))
+    AgentLoad.objects.bulk_create([AgentLoad(agent_id=i) for i in ids], ignore_conflicts=True)
+    return list(
+        AgentLoad.objects.filter(agent_id__in=ids)
+        .order_by(F('last_assigned_at').asc(nulls_first=True), 'agent_id')
+    )
+
+
+def _plan_round_robin(rows, loads):
+    plan = defaultdict(list)
+    agents = cycle(load.agent_id for load in loads)
+    for row in rows:
+        plan[next(agents)].append(row[0])
+    return plan
+
+
+def _plan_least_loaded(rows, loads):
+    plan = defaultdict(list)
+    heap = [(load.open_leads, position, load.agent_id) for position, load in enumerate(loads)]
+    heapq.heapify(heap)
+    for row in rows:
+        open_leads, position, agent_id = heapq.heappop(heap)
+        plan[agent_id].append(row[0])
+        heapq.heappush(heap, (open_leads + _is_open(row[2]), position, agent_id))
+    return plan
+
+
+def _plan_territory(rows, loads):
+    plan = defaultdict(list)
+    counts = {load.agent_id: load.open_leads for load in loads}
+    weights = {load.agent_id: max(load.weight, 1) for load in loads}
+    by_state = defaultdict(list)
+    by_country = defaultdict(list)
+    for load in loads:
+        country = load.country.strip().lower()
+        if country:
+            by_country[country].append(load.agent_id)
+            if load.state:
+                by_state[(country, load.state.strip().lower())].append(load.agent_id)
+    everyone = list(counts)
+
+    for lead_id, _, status, country, state in rows:
+        country = country.strip().lower()
+        candidates = (
+            by_state.get((country, state.strip().lower()))
+            or by_country.get(country)
+            or everyone
+        )
+        agent_id = min(candidates, key=lambda a: counts[a] / weights[a])
+        plan[agent_id].append(lead_id)
+        counts[agent_id] += _is_open(status)
+    return plan
+
+
+PLANNERS = {
+    ROUND_ROBIN: _plan_round_robin,
+    LEAST_LOADED: _plan_least_loaded,
+    TERRITORY: _plan_territory,
+}
+
+
+def _apply_load_deltas(deltas, assigned_at=None):
+    for agent_id, delta in deltas.items():
+        if not delta and assigned_at is None:
+            continue
+        updates = {'open_leads': Greatest(F('open_leads') + delta, 0)}
+        if assigned_at is not None:
+            updates['last_assigned_at'] = assigned_at
+        if not AgentLoad.objects.filter(agent_id=agent_id).update(**updates) and delta > 0:
+            # First lead for an agent the planner has not seen yet
+            AgentLoad.objects.bulk_create(
+                [AgentLoad(agent_id=agent_id, open_leads=delta, last_assigned_at=assigned_at)],
+                ignore_conflicts=True,
+            )
+
+
+def assign_leads(leads, strategy=LEAST_LOADED, agent_ids=None):
+    """
+    Distribute ``leads`` (a Lead queryset) across agents with ``strategy``.
+
+    The plan is computed in memory from one read of the leads and one of the
+    counters, then written with a single UPDATE per receiving agent.
+    Returns a mapping of agent id to the number of leads it received.
+    """
+    if strategy not in PLANNERS:
+        raise ValueError(f"Unknown assignment strategy: {strategy}")
+
+    rows = list(leads.values_list('id', 'assigned_to_id', 'status', 'country', 'state'))
+    loads = _agent_loads(agent_ids)
+    if not rows or not loads:
+        return {}
+
+    plan = PLANNERS[strategy](rows, loads)
+    deltas = Counter()
+    for _, assigned_to_id, status, _, _ in rows:
+        if assigned_to_id and _is_open(status):
+            deltas[assigned_to_id] -= 1
+    open_by_id = {row[0]: _is_open(row[2]) for row in rows}
+    for agent_id, lead_ids in plan.items():
+        deltas[agent_id] += sum(open_by_id[lead_id] for lead_id in lead_ids)
+
+    now = timezone.now()
+    with transaction.atomic():
+        for agent_id, lead_ids in plan.items():
+            Lead.objects.filter(id__in=lead_ids).update(assigned_to_id=agent_id, updated_at=now)
+        _apply_load_deltas({a: d for a, d in deltas.items() if a not in plan})
+        _apply_load_deltas({a: deltas[a] for a in plan}, assigned_at=now)
+
+    return {agent_id: len(lead_ids) for agent_id, lead_ids in plan.items()}
+
+
+def track_lead_change(lead, previous_assigned_id=None, previous_status=None):
+    """Keep the load counters in step with a single lead write."""
+    deltas = Counter()
+    if previous_assigned_id and previous_status and _is_open(previous_status):
+        deltas[previous_assigned_id] -= 1
+    if lead.assigned_to_id and _is_open(lead.status):
+        deltas[lead.assigned_to_id] += 1
+    _apply_load_deltas(deltas)
+
+
+def track_leads_deleted(leads):
+    """Release the load counters held by ``leads``; call before deleting them."""
+    open_counts = Counter(
+        lead.assigned_to_id for lead in leads
+        if lead.assigned_to_id and _is_open(lead.status)
+    )
+    _apply_load_deltas({agent_id: -count for agent_id, count in open_counts.items()})
+
+
+def rebuild_agent_loads():
+    """Recount open leads per agent in one aggregate query and store the counters."""
+    counts = dict(
+        User.objects.filter(role=User.Role.AGENT)
+        .annotate(
+            open_count=Count(
+                'assigned_leads',
+                filter=~Q(assigned_leads__status__in=Lead.CLOSED_STATUSES)
+            )
+        )
+        .values_list('id', 'open_count')
+    )
+    AgentLoad.objects.bulk_create([AgentLoad(agent_id=i) for i in counts], ignore_conflicts=True)
+    loads = list(AgentLoad.objects.filter(agent_id__in=counts))
+    for load in loads:
+        load.open_leads = counts[load.agent_id]
+    AgentLoad.objects.bulk_update(loads, ['open_leads'], batch_size=500)
+    return len(loads)
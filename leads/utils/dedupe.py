@@ -0,0 +1,238 @@
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .assignment import track_leads_deleted
+from ..models import (
+    Lead, Contact, Note, Correspondence, Reminder, ArchivedNote,
+    ArchivedCorrespondence,
+)
+
+# Values per IN lookup, well under SQLite's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+# Blank values are copied from duplicates into the surviving record on merge.
+LEAD_MERGE_FIELDS = [
+    'company', 'job_title', 'phone', 'source', 'address', 'city', 'state',
+    'country', 'postal_code', 'description',
+]
+CONTACT_MERGE_FIELDS = [
+    'phone', 'company', 'job_title', 'address', 'city', 'state', 'country', 'notes',
+]
+
+
+def _key_groups(queryset, key):
+    duplicated = (
+        queryset.exclude(**{key: ''})
+        .order_by()
+        .values(key)
+        .annotate(total=Count('pk'))
+        .filter(total__gt=1)
+        .values(key)
+    )
+    rows = (
+        queryset.filter(**{f'{key}__in': duplicated})
+        .order_by(key, 'created_at')
+        .values_list(key, 'pk')
+    )
+    for _, group in groupby(rows, itemgetter(0)):
+        yield [pk for _, pk in group]
+
+
+def find_duplicate_clusters(queryset):
+    """
+    Group records of ``queryset`` sharing any blocking key into clusters.
+
+    Each key is resolved with a single query over its index; the per-key
+    groups are then joined with a union-find so a record matching one
+    duplicate by email and another by phone ends up in one cluster.
+    """
+    parent = {}
+    order = []
+
+    def find(pk):
+        while parent[pk] != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    for key in queryset.model.DEDUPE_KEY_FIELDS:
+        for group in _key_groups(queryset, key):
+            for pk in group:
+                if pk not in parent:
+                    parent[pk] = pk
+                    order.append(pk)
+            root = find(group[0])
+            for pk in group[1:]:
+                parent[find(pk)] = root
+
+    clusters = {}
+    for pk in order:
+        clusters.setdefault(find(pk), []).append(pk)
+    return list(clusters.values())
+
+
+def _fill_blanks(primary, duplicates, fields):
+    changed = []
+    for field in fields:
+        if getattr(primary, field):
+            continue
+        for duplicate in duplicates:
+            value = getattr(duplicate, field)
+            if value:
+                setattr(primary, field, value)
+                changed.append(field)
+                break
+    if changed:
+        primary.save()
+
+
+def merge_leads(primary, duplicate_ids):
+    """Fold the given leads into ``primary`` and delete them."""
+    duplicates = list(Lead.objects.filter(id__in=duplicate_ids).exclude(pk=primary.pk))
+    ids = [lead.pk for lead in duplicates]
+    if not ids:
+        return 0
+
+    Through = Contact.leads.through
+    with transaction.atomic():
+        Note.objects.filter(lead_id__in=ids).update(lead=primary)
+        Reminder.objects.filter(lead_id__in=ids).update(lead=primary)
+        Correspondence.objects.filter(lead_id__in=ids).update(lead=primary)
+        ArchivedNote.objects.filter(lead_id__in=ids).update(lead=primary)
+        ArchivedCorrespondence.objects.filter(lead_id__in=ids).update(lead=primary)
+        contact_ids = Through.objects.filter(lead_id__in=ids).values_list('contact_id', flat=True).distinct()
+        Through.objects.bulk_create(
+            [Through(contact_id=contact_id, lead_id=primary.pk) for contact_id in contact_ids],
+            ignore_conflicts=True,
+        )
+        Through.objects.filter(lead_id__in=ids).delete()
+        _fill_blanks(primary, duplicates, LEAD_MERGE_FIELDS)
+        track_leads_deleted(duplicates)
+        Lead.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def merge_contacts(primary, duplicate_ids):
+    """Fold the given contacts into ``primary`` and delete them."""
+    duplicates = list(Contact.objects.filter(id__in=duplicate_ids).exclude(pk=primary.pk))
+    ids = [contact.pk for contact in duplicates]
+    if not ids:
+        return 0
+
+    Through = Contact.leads.through
+    with transaction.atomic():
+        Correspondence.objects.filter(contact_id__in=ids).update(contact=primary)
+        ArchivedCorrespondence.objects.filter(contact_id__in=ids).update(contact=primary)
+        lead_ids = Through.objects.filter(contact_id__in=ids).values_list('lead_id', flat=True).distinct()
+        Through.objects.bulk_create(
+            [Through(contact_id=primary.pk, lead_id=lead_id) for lead_id in lead_ids],
+            ignore_conflicts=True,
+        )
+        Through.objects.filter(contact_id__in=ids).delete()
+        _fill_blanks(primary, duplicates, CONTACT_MERGE_FIELDS)
+        Contact.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def recorded_clusters(queryset):
+    """The clusters the background scan recorded, limited to rows of ``queryset``."""
+    rows = (
+        queryset.exclude(duplicate_group='')
+        .order_by('duplicate_group', 'created_at')
+        .values_list('duplicate_group', 'pk')
+    )
+    clusters = []
+    for _, group in groupby(rows, itemgetter(0)):
+        pks = [pk for _, pk in group]
+        if len(pks) > 1:
+            clusters.append(pks)
+    return clusters
+
+
+def _chunked(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _neighbourhood(model, pks, groups):
+    """Pks of every row linked to ``pks`` or to the recorded ``groups`` through shared keys."""
+    keys = model.DEDUPE_KEY_FIELDS
+    members = set()
+    for chunk in _chunked(pks):
+        members.update(model.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+    for chunk in _chunked(groups):
+        members.update(model.objects.filter(duplicate_group__in=chunk).values_list('pk', flat=True))
+
+    frontier = set(members)
+    seen = {key: {''} for key in keys}
+    while frontier:
+        new_values = {key: [] for key in keys}
+        for chunk in _chunked(frontier):
+            for values in model.objects.filter(pk__in=chunk).values_list(*keys):
+                for key, value in zip(keys, values):
+                    if value not in seen[key]:
+                        seen[key].add(value)
+                        new_values[key].append(value)
+
+        found = set()
+        chunks = {key: list(_chunked(values)) for key, values in new_values.items()}
+        for position in range(max(len(key_chunks) for key_chunks in chunks.values())):
+            query = Q()
+            for key, key_chunks in chunks.items():
+                if position < len(key_chunks):
+                    query |= Q(**{f'{key}__in': key_chunks[position]})
+            found.update(model.objects.filter(query).values_list('pk', flat=True))
+        frontier = found - members
+        members |= found
+    return members
+
+
+def _record_clusters(model, pks):
+    grouped = set()
+    for cluster in find_duplicate_clusters(model.objects.filter(pk__in=pks)):
+        group = min(str(pk) for pk in cluster)
+        model.objects.filter(pk__in=cluster).exclude(duplicate_group=group).update(duplicate_group=group)
+        grouped.update(cluster)
+    for chunk in _chunked(set(pks) - grouped):
+        model.objects.filter(pk__in=chunk).exclude(duplicate_group='').update(duplicate_group='')
+
+
+def scan_duplicates(model, chunk_size=1000):
+    """
+    Refresh keys and recorded clusters for rows of ``model`` flagged as changed.
+
+    ``save()`` and the queryset's ``update()``/``bulk_update()`` set
+    ``dedupe_pending`` whenever a name, email, phone or company may have
+    changed, so each run reads only those rows; raw SQL writes must set it
+    themselves. Every cluster a changed row joins or leaves is recomputed
+    and stored in ``duplicate_group``. Returns the number of rows scanned.
+    """
+    scanned = 0
+    fields = ['duplicate_group', *model.DEDUPE_SOURCE_FIELDS, *model.DEDUPE_KEY_FIELDS]
+    while True:
+        with transaction.atomic():
+            ids = list(
+                model.objects.filter(dedupe_pending=True).order_by().values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            # Cleared before reading, so a write racing the scan flags its row again
+            model.objects.filter(pk__in=ids).update(dedupe_pending=False)
+
+            changed = []
+            old_groups = set()
+            for obj in model.objects.filter(pk__in=ids).only(*fields):
+                if obj.duplicate_group:
+                    old_groups.add(obj.duplicate_group)
+                before = obj.dedupe_keys()
+                obj.set_dedupe_keys()
+                if before != obj.dedupe_keys():
+                    changed.append(obj)
+            model.objects.bulk_update(changed, model.DEDUPE_KEY_FIELDS)
+            _record_clusters(model, _neighbourhood(model, ids, old_groups))
+        scanned += len(ids)
+    return scanned
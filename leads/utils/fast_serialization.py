@@ -0,0 +1,232 @@
+"""
+Read-only row builders for list endpoints.
+
+Each builder mirrors one of the serializers in ``leads.serializers``: it
+reads its columns with ``values_list``, converts them with the same rules
+DRF's field classes apply, takes nested users from the cached user
+directory and resolves related records with one query per relation for
+the whole page. The output must stay
+identical to the ModelSerializer output, so any field added to those
+serializers has to be added here as well.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.utils import timezone
+
+from accounts.directory import get_directory
+from ..models import Lead, Contact, Note, Correspondence, Reminder
+
+# Marks a column holding a user id that renders as a UserSummaryField.
+USER = object()
+
+
+def _uuid(value):
+    return None if value is None else str(value)
+
+
+def format_datetime(value):
+    if value is None:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+_CENTS = Decimal('0.01')
+
+
+def _money(value):
+    if value is None:
+        return None
+    return '{:f}'.format(value.quantize(_CENTS))
+
+
+def _float(value):
+    return None if value is None else float(value)
+
+
+def user_rows(ids):
+    directory = get_directory()
+    return {i: directory.summary(i) for i in set(ids) if i is not None}
+
+
+class RowBuilder:
+    """Serialize a model's rows from ``(output name, column, converter)`` triples."""
+
+    def __init__(self, model, fields, related=None):
+        self.model = model
+        self.names = [name for name, _, _ in fields]
+        self.columns = [column for _, column, _ in fields]
+        self.converters = [converter for _, _, converter in fields]
+        self.related = related or {}
+
+    def build(self, queryset):
+        """Return ``(raw primary key, row dict)`` pairs for ``queryset``."""
+        values = list(queryset.values_list(*self.columns))
+        if not values:
+            return []
+
+        user_positions = [i for i, c in enumerate(self.converters) if c is USER]
+        users = user_rows(row[i] for row in values for i in user_positions)
+        converters = [
+            users.get if converter is USER else converter
+            for converter in self.converters
+        ]
+
+        pks = [row[0] for row in values]
+        related = {name: loader(pks) for name, loader in self.related.items()}
+
+        rows = []
+        for row in values:
+            data = {}
+            for name, value, converter in zip(self.names, row, converters):
+                if name in related:
+                    data[name] = related[name].get(row[0], [])
+                elif converter is None:
+                    data[name] = value
+                else:
+                    data[name] = converter(value)
+            rows.append((row[0], data))
+        return rows
+
+    def serialize_ids(self, ids):
+        """Serialize the rows with primary keys ``ids``, keeping their order."""
+        rows = dict(self.build(self.model.objects.filter(pk__in=ids)))
+        return [rows[pk] for pk in ids if pk in rows]
+
+
+def _children(builder, parent_column):
+    def load(parent_ids):
+        grouped = defaultdict(list)
+        queryset = builder.model.objects.filter(**{f'{parent_column}__in': parent_ids})
+        for _, row in builder.build(queryset):
+            grouped[row['_parent']].append(row)
+            del row['_parent']
+        return grouped
+    return load
+
+
+def _with_parent(fields, parent_column):
+    return [*fields, ('_parent', parent_column, None)]
+
+
+def _contact_leads(contact_ids):
+    Through = Contact.leads.through
+    grouped = defaultdict(list)
+    rows = (
+        Through.objects.filter(contact_id__in=contact_ids)
+        .order_by(*[
+            f"-lead__{field[1:]}" if field.startswith('-') else f"lead__{field}"
+            for field in Lead._meta.ordering
+        ])
+        .values_list('contact_id', 'lead_id')
+    )
+    for contact_id, lead_id in rows:
+        grouped[contact_id].append(str(lead_id))
+    return grouped
+
+
+NOTE_FIELDS = [
+    ('id', 'id', _uuid),
+    ('lead', 'lead_id', _uuid),
+    ('content', 'content', None),
+    ('created_by', 'created_by_id', USER),
+    ('created_at', 'created_at', format_datetime),
+    ('updated_at', 'updated_at', format_datetime),
+]
+
+CORRESPONDENCE_FIELDS = [
+    ('id', 'id', _uuid),
+    ('contact', 'contact_id', _uuid),
+    ('lead', 'lead_id', _uuid),
+    ('type', 'type', None),
+    ('subject', 'subject', None),
+    ('content', 'content', None),
+    ('date', 'date', format_datetime),
+    ('created_by', 'created_by_id', USER),
+    ('created_at', 'created_at', format_datetime),
+    ('updated_at', 'updated_at', format_datetime),
+]
+
+REMINDER_FIELDS = [
+    ('id', 'id', _uuid),
+    ('lead', 'lead_id', _uuid),
+    ('title', 'title', None),
+    ('description', 'description', None),
+    ('due_date', 'due_date', format_datetime),
+    ('priority', 'priority', None),
+    ('is_completed', 'is_completed', None),
+    ('created_by', 'created_by_id', USER),
+    ('created_at', 'created_at', format_datetime),
+    ('updated_at', 'updated_at', format_datetime),
+]
+
+CONTACT_FIELDS = [
+    ('id', 'id', _uuid),
+    ('first_name', 'first_name', None),
+    ('last_name', 'last_name', None),
+    ('email', 'email', None),
+    ('phone', 'phone', None),
+    ('company', 'company', None),
+    ('job_title', 'job_title', None),
+    ('leads', 'id', None),
+    ('address', 'address', None),
+    ('city', 'city', None),
+    ('state', 'state', None),
+    ('country', 'country', None),
+    ('notes', 'notes', None),
+    ('created_by', 'created_by_id', USER),
+    ('created_at', 'created_at', format_datetime),
+    ('updated_at', 'updated_at', format_datetime),
+]
+
+LEAD_FIELDS = [
+    ('id', 'id', _uuid),
+    ('first_name', 'first_name', None),
+    ('last_name', 'last_name', None),
+    ('company', 'company', None),
+    ('job_title', 'job_title', None),
+    ('email', 'email', None),
+    ('phone', 'phone', None),
+    ('status', 'status', None),
+    ('priority', 'priority', None),
+    ('source', 'source', None),
+    ('assigned_to', 'assigned_to_id', USER),
+    ('value', 'value', _money),
+    ('score', 'score', _float),
+    ('address', 'address', None),
+    ('city', 'city', None),
+    ('state', 'state', None),
+    ('country', 'country', None),
+    ('postal_code', 'postal_code', None),
+    ('description', 'description', None),
+    ('contacts', 'id', None),
+    ('notes', 'id', None),
+    ('reminders', 'id', None),
+    ('correspondence', 'id', None),
+    ('created_by', 'created_by_id', USER),
+    ('created_at', 'created_at', format_datetime),
+    ('updated_at', 'updated_at', format_datetime),
+    ('last_contacted', 'last_contacted', format_datetime),
+]
+
+contact_rows = RowBuilder(Contact, CONTACT_FIELDS, related={'leads': _contact_leads})
+
+lead_rows = RowBuilder(
+    Lead,
+    LEAD_FIELDS,
+    related={
+        'contacts': _children(
+            RowBuilder(Contact, _with_parent(CONTACT_FIELDS, 'leads__id'), related={'leads': _contact_leads}),
+            'leads__id',
+        ),
+        'notes': _children(RowBuilder(Note, _with_parent(NOTE_FIELDS, 'lead_id')), 'lead_id'),
+        'reminders': _children(RowBuilder(Reminder, _with_parent(REMINDER_FIELDS, 'lead_id')), 'lead_id'),
+        'correspondence': _children(
+            RowBuilder(Correspondence, _with_parent(CORRESPONDENCE_FIELDS, 'lead_id')),
+            'lead_id',
+        ),
+    },
+)
@@ -0,0 +1,44 @@
+from django.db import transaction
+
+from ..models import Contact
+
+Through = Contact.leads.through
+
+
+def link(contact_ids, lead_ids):
+    """Link every contact in ``contact_ids`` to every lead in ``lead_ids`` with one INSERT."""
+    Through.objects.bulk_create(
+        [
+            Through(contact_id=contact_id, lead_id=lead_id)
+            for contact_id in contact_ids
+            for lead_id in lead_ids
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def unlink(contact_ids, lead_ids):
+    """Remove the links between ``contact_ids`` and ``lead_ids`` with one DELETE."""
+    deleted, _ = Through.objects.filter(contact_id__in=contact_ids, lead_id__in=lead_ids).delete()
+    return deleted
+
+
+def set_contact_leads(contact, lead_ids, leads=None):
+    """
+    Make ``lead_ids`` the contact's leads, writing only the difference.
+
+    Only links to ``leads`` (a Lead queryset, by default all of them) are
+    removed, so a user replacing the list cannot drop links to leads they
+    cannot see.
+    """
+    wanted = set(lead_ids)
+    current = Through.objects.filter(contact_id=contact.pk)
+    if leads is not None:
+        current = current.filter(lead_id__in=leads.values('pk'))
+    current = set(current.values_list('lead_id', flat=True))
+    with transaction.atomic():
+        if wanted - current:
+            link([contact.pk], wanted - current)
+        if current - wanted:
+            unlink([contact.pk], current - wanted)
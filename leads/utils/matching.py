@@ -0,0 +1,66 @@
+import re
+
+_NON_DIGITS = re.compile(r'\D')
+_WORDS = re.compile(r'[a-z0-9]+')
+
+# Comparing the trailing digits makes "+254 712 345 678" and "0712345678" equal.
+PHONE_KEY_DIGITS = 9
+
+COMPANY_SUFFIXES = {'inc', 'ltd', 'llc', 'llp', 'plc', 'co', 'corp', 'company', 'limited', 'gmbh', 'the'}
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def soundex(word):
+    letters = [c for c in (word or '').lower() if 'a' <= c <= 'z']
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if letter not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def email_key(email):
+    email = (email or '').strip().lower()
+    local, sep, domain = email.partition('@')
+    if not sep:
+        return email
+    local = local.split('+', 1)[0]
+    if domain in ('gmail.com', 'googlemail.com'):
+        local = local.replace('.', '')
+        domain = 'gmail.com'
+    return f"{local}@{domain}"
+
+
+def phone_key(phone):
+    digits = _NON_DIGITS.sub('', phone or '')
+    if len(digits) < 7:
+        return ''
+    return digits[-PHONE_KEY_DIGITS:]
+
+
+def company_key(company):
+    words = _WORDS.findall((company or '').lower())
+    return ''.join(w for w in words if w not in COMPANY_SUFFIXES)
+
+
+def name_key(first_name, last_name, company=''):
+    names = soundex(first_name) + soundex(last_name)
+    if not names:
+        return ''
+    return f"{names}:{company_key(company)}"[:64]
@@ -0,0 +1,124 @@
+import logging
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import OutboxEvent, WebhookEndpoint, WebhookDelivery
+
+logger = logging.getLogger(__name__)
+
+LEAD_EVENT_FIELDS = [
+    'id', 'first_name', 'last_name', 'company', 'email', 'phone', 'status',
+    'priority', 'source', 'assigned_to_id', 'value', 'created_at', 'updated_at',
+]
+CONTACT_EVENT_FIELDS = [
+    'id', 'first_name', 'last_name', 'email', 'phone', 'company', 'job_title',
+    'created_at', 'updated_at',
+]
+CORRESPONDENCE_EVENT_FIELDS = [
+    'id', 'contact_id', 'lead_id', 'type', 'subject', 'date', 'created_by_id', 'created_at',
+]
+
+# Writes within this window are relayed together, so rapid edits coalesce.
+RELAY_DELAY_SECONDS = 2
+
+
+def _schedule_relay():
+    from ..tasks import relay_outbox
+
+    try:
+        if cache.add('outbox-relay-scheduled', 1, RELAY_DELAY_SECONDS):
+            relay_outbox.apply_async(countdown=RELAY_DELAY_SECONDS)
+    except Exception:
+        # The periodic relay still picks the event up.
+        logger.warning('Could not schedule outbox relay', exc_info=True)
+
+
+def record_event(event_type, instance, fields, coalesce=False, **extra):
+    """
+    Store an event for ``instance`` in the current transaction.
+
+    Call inside the ``transaction.atomic`` block that writes ``instance`` so
+    the event exists exactly when the change commits. With ``coalesce``,
+    a newer event for the same object replaces undelivered older ones.
+    """
+    payload = {field: getattr(instance, field) for field in fields}
+    payload.update(extra)
+    event = OutboxEvent.objects.create(
+        event_type=event_type,
+        object_id=str(instance.pk),
+        coalesce_key=f"{event_type}:{instance.pk}" if coalesce else '',
+        payload=payload,
+    )
+    transaction.on_commit(_schedule_relay)
+    return event
+
+
+def record_lead_saved(lead, created=False, previous_status=None):
+    if created:
+        record_event('lead.created', lead, LEAD_EVENT_FIELDS)
+        return
+    if previous_status is not None and previous_status != lead.status:
+        record_event('lead.status_changed', lead, LEAD_EVENT_FIELDS, previous_status=previous_status)
+    record_event('lead.updated', lead, LEAD_EVENT_FIELDS, coalesce=True)
+
+
+def record_contact_saved(contact, created=False):
+    if created:
+        record_event('contact.created', contact, CONTACT_EVENT_FIELDS)
+    else:
+        record_event('contact.updated', contact, CONTACT_EVENT_FIELDS, coalesce=True)
+
+
+def record_correspondence_created(correspondence):
+    record_event('correspondence.created', correspondence, CORRESPONDENCE_EVENT_FIELDS)
+
+
+def dispatch_events(batch_size=200):
+    """Turn undispatched events into one pending delivery per subscribed endpoint."""
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(dispatched_at__isnull=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        latest = {}
+        for event in events:
+            if event.coalesce_key:
+                latest[event.coalesce_key] = event.pk
+        current = [e for e in events if not e.coalesce_key or latest[e.coalesce_key] == e.pk]
+
+        if latest:
+            WebhookDelivery.objects.filter(
+                status='pending', event__coalesce_key__in=list(latest)
+            ).update(status='superseded')
+
+        endpoints = list(WebhookEndpoint.objects.filter(is_active=True))
+        WebhookDelivery.objects.bulk_create(
+            [
+                WebhookDelivery(event=event, endpoint=endpoint, next_attempt_at=now)
+                for event in current
+                for endpoint in endpoints
+                if endpoint.subscribes_to(event.event_type)
+            ],
+            ignore_conflicts=True,
+        )
+        OutboxEvent.objects.filter(pk__in=[e.pk for e in events]).update(dispatched_at=now)
+    return len(events)
+
+
+def prune_outbox(older_than_days=7):
+    """Delete dispatched events whose deliveries are all finished."""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = (
+        OutboxEvent.objects.filter(dispatched_at__lt=cutoff)
+        .exclude(deliveries__status='pending')
+        .delete()
+    )
+    return deleted
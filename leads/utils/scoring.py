@@ -0,0 +1,147 @@
+from collections import Counter
+
+from django.db.models import Count
+from django.utils import timezone
+
+from ..models import Lead, Note, Correspondence, Reminder, ArchivedNote, ArchivedCorrespondence
+
+STATUS_POINTS = {
+    'new': 10,
+    'contacted': 20,
+    'qualified': 35,
+    'proposal': 50,
+    'negotiation': 60,
+    'closed_won': 0,
+    'closed_lost': 0,
+}
+PRIORITY_POINTS = {'low': 0, 'medium': 5, 'high': 10, 'critical': 15}
+SOURCE_POINTS = {
+    'referral': 10,
+    'partner': 8,
+    'website': 6,
+    'event': 6,
+    'email': 4,
+    'social': 4,
+    'cold_call': 2,
+}
+
+VALUE_POINTS = 15
+VALUE_CAP = 100000
+
+RECENCY_POINTS = 10
+RECENCY_HALF_LIFE_DAYS = 14
+
+ACTIVITY_WEIGHTS = {'notes': 1.0, 'correspondence': 2.0, 'reminders': 0.5}
+ACTIVITY_POINTS = 10
+ACTIVITY_CAP = 20
+
+BATCH_SIZE = 2000
+
+
+def _lookup(values, table):
+    """Map an array of labels through ``table``, looking each distinct label up once."""
+    import numpy as np
+
+    labels, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    points = np.array([table.get(label, 0) for label in labels], dtype=float)
+    return points[inverse]
+
+
+def compute_scores(statuses, priorities, sources, values, last_contacted, activity, now=None):
+    """
+    Score a batch of leads column by column.
+
+    ``last_contacted`` holds POSIX timestamps (NaN when never contacted) and
+    ``activity`` maps each key of ``ACTIVITY_WEIGHTS`` to an array of counts.
+    """
+    # numpy is imported on first use so web processes start without it
+    import numpy as np
+
+    now = (now or timezone.now()).timestamp()
+
+    scores = _lookup(statuses, STATUS_POINTS)
+    scores += _lookup(priorities, PRIORITY_POINTS)
+    scores += _lookup(np.char.lower(np.char.strip(np.asarray(sources, dtype=str))), SOURCE_POINTS)
+
+    values = np.nan_to_num(np.asarray(values, dtype=float), nan=0.0).clip(0, VALUE_CAP)
+    scores += VALUE_POINTS * np.log1p(values) / np.log1p(VALUE_CAP)
+
+    age_days = (now - np.asarray(last_contacted, dtype=float)) / 86400
+    recency = RECENCY_POINTS * np.exp2(-age_days.clip(0) / RECENCY_HALF_LIFE_DAYS)
+    scores += np.nan_to_num(recency, nan=0.0)
+
+    weighted = sum(weight * np.asarray(activity[key], dtype=float) for key, weight in ACTIVITY_WEIGHTS.items())
+    scores += ACTIVITY_POINTS * np.log1p(weighted.clip(0, ACTIVITY_CAP)) / np.log1p(ACTIVITY_CAP)
+
+    return scores.round(2)
+
+
+# Archived rows still count, so archiving old history leaves scores unchanged
+ACTIVITY_MODELS = {
+    'notes': (Note, ArchivedNote),
+    'correspondence': (Correspondence, ArchivedCorrespondence),
+    'reminders': (Reminder,),
+}
+
+
+def _activity_counts(lead_ids):
+    counts = {}
+    for key, models in ACTIVITY_MODELS.items():
+        totals = Counter()
+        for model in models:
+            totals.update(dict(
+                model.objects.filter(lead_id__in=lead_ids)
+                .order_by()
+                .values('lead_id')
+                .annotate(total=Count('id'))
+                .values_list('lead_id', 'total')
+            ))
+        counts[key] = totals
+    return counts
+
+
+def rescore_leads(lead_ids):
+    """Recompute and store scores for ``lead_ids``. Returns a mapping of id to score."""
+    rows = list(
+        Lead.objects.filter(id__in=lead_ids)
+        .order_by()
+        .values_list('id', 'status', 'priority', 'source', 'value', 'last_contacted', 'score')
+    )
+    if not rows:
+        return {}
+
+    ids, statuses, priorities, sources, values, contacted, current = zip(*rows)
+    counts = _activity_counts(ids)
+    scores = compute_scores(
+        statuses,
+        priorities,
+        sources,
+        values,
+        [d.timestamp() if d else float('nan') for d in contacted],
+        {key: [counts[key].get(i, 0) for i in ids] for key in ACTIVITY_WEIGHTS},
+    )
+
+    changed = [
+        Lead(id=lead_id, score=float(score))
+        for lead_id, score, old in zip(ids, scores, current)
+        if score != old
+    ]
+    if changed:
+        Lead.objects.bulk_update(changed, ['score'], batch_size=500)
+    return dict(zip(ids, scores.tolist()))
+
+
+def rescore_all_leads(batch_size=BATCH_SIZE):
+    """Walk the lead table by primary key and rescore it ``batch_size`` leads at a time."""
+    total = 0
+    last_id = None
+    while True:
+        batch = Lead.objects.order_by('id')
+        if last_id is not None:
+            batch = batch.filter(id__gt=last_id)
+        ids = list(batch.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        rescore_leads(ids)
+        total += len(ids)
+        last_id = ids[-1]
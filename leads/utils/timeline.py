@@ -0,0 +1,147 @@
+import base64
+import json
+import uuid
+
+from auditlog.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import BooleanField, CharField, F, Q, TextField, Value
+from django.db.models.functions import Cast
+from django.utils.dateparse import parse_datetime
+
+from ..models import Lead, Note, Correspondence, Reminder, ArchivedNote, ArchivedCorrespondence
+from .fast_serialization import format_datetime, user_rows
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 100
+
+COLUMNS = (
+    'entry_kind', 'entry_at', 'entry_id', 'entry_title', 'entry_body',
+    'entry_detail', 'entry_actor', 'entry_archived',
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(occurred_at, item_id):
+    raw = json.dumps([occurred_at.isoformat(), item_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        occurred_at, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        occurred_at = parse_datetime(occurred_at)
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+    if occurred_at is None:
+        raise InvalidCursor('Invalid cursor')
+    return occurred_at, str(item_id)
+
+
+def _text(field):
+    if field is None:
+        return Value('', output_field=TextField())
+    return Cast(field, TextField())
+
+
+def _branch(queryset, kind, occurred_at, title=None, body=None, detail=None, actor='created_by_id', archived=False):
+    return queryset.order_by().annotate(
+        entry_kind=Value(kind, output_field=CharField()),
+        entry_at=F(occurred_at),
+        entry_id=Cast('pk', CharField()),
+        entry_title=_text(title),
+        entry_body=_text(body),
+        entry_detail=_text(detail),
+        entry_actor=F(actor),
+        entry_archived=Value(archived, output_field=BooleanField()),
+    ).values_list(*COLUMNS)
+
+
+def _branches(lead):
+    lead_changes = LogEntry.objects.filter(
+        content_type=ContentType.objects.get_for_model(Lead),
+        object_pk=str(lead.pk),
+    )
+    return [
+        _branch(Note.objects.filter(lead=lead), 'note', 'created_at', body='content'),
+        _branch(ArchivedNote.objects.filter(lead=lead), 'note', 'created_at', archived=True),
+        _branch(
+            Correspondence.objects.filter(lead=lead), 'correspondence', 'date',
+            title='subject', body='content', detail='type',
+        ),
+        _branch(
+            ArchivedCorrespondence.objects.filter(lead=lead), 'correspondence', 'date',
+            title='subject', detail='type', archived=True,
+        ),
+        _branch(
+            Reminder.objects.filter(lead=lead), 'reminder', 'created_at',
+            title='title', body='description', detail='priority',
+        ),
+        _branch(
+            lead_changes, 'change', 'timestamp',
+            body='changes', detail='action', actor='actor_id',
+        ),
+    ]
+
+
+def _public_id(kind, item_id):
+    # Audit log entries have integer keys; everything else is a UUID whose
+    # text form depends on the database backend.
+    return item_id if kind == 'change' else str(uuid.UUID(item_id))
+
+
+def _archived_bodies(rows):
+    bodies = {}
+    for kind, model in (('note', ArchivedNote), ('correspondence', ArchivedCorrespondence)):
+        ids = [_public_id(kind, row[2]) for row in rows if row[0] == kind and row[7]]
+        if ids:
+            bodies.update((str(obj.pk), obj.content) for obj in model.objects.filter(pk__in=ids))
+    return bodies
+
+
+def lead_timeline(lead, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    Return the newest ``limit`` activities of ``lead`` older than ``cursor``.
+
+    Every source is read through its ``(lead, timestamp)`` index and the
+    branches are combined with UNION ALL, so one query serves the page.
+    Returns ``(items, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    branches = _branches(lead)
+    if cursor:
+        occurred_at, item_id = decode_cursor(cursor)
+        after = Q(entry_at__lt=occurred_at) | Q(entry_at=occurred_at, entry_id__lt=item_id)
+        branches = [branch.filter(after) for branch in branches]
+
+    if connection.features.supports_slicing_ordering_in_compound:
+        branches = [branch.order_by('-entry_at', '-entry_id')[:limit + 1] for branch in branches]
+
+    first, *rest = branches
+    rows = list(first.union(*rest, all=True).order_by('-entry_at', '-entry_id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    users = user_rows(row[6] for row in rows)
+    bodies = _archived_bodies(rows)
+    items = []
+    for kind, occurred_at, item_id, title, body, detail, actor_id, archived in rows:
+        item_id = _public_id(kind, item_id)
+        items.append({
+            'type': kind,
+            'id': item_id,
+            'timestamp': format_datetime(occurred_at),
+            'title': title,
+            'body': bodies.get(item_id, '') if archived else body,
+            'detail': detail,
+            'actor': users.get(actor_id),
+            'archived': archived,
+        })
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last[1], last[2])
+    return items, next_cursor
@@ -0,0 +1,190 @@
+import hashlib
+import hmac
+import json
+import random
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+import urllib3
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import WebhookDelivery
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT_SECONDS = 5
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_for(endpoint):
+    """
+    Keep-alive connection pool for an endpoint, shared across relay runs.
+
+    ``block=True`` with ``maxsize`` caps the requests in flight to one
+    endpoint at its ``max_concurrency``; extra sender threads wait.
+    """
+    url = urllib3.util.parse_url(endpoint.url)
+    key = (url.scheme, url.host, url.port, endpoint.max_concurrency)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = urllib3.connection_from_url(
+                endpoint.url,
+                maxsize=max(endpoint.max_concurrency, 1),
+                block=True,
+                timeout=urllib3.Timeout(connect=CONNECT_TIMEOUT_SECONDS, read=settings.WEBHOOK_TIMEOUT_SECONDS),
+                retries=False,
+            )
+            _pools[key] = pool
+    return pool
+
+
+def sign(secret, timestamp, body):
+    message = f"{timestamp}.".encode('utf-8') + body
+    return hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def _post(delivery):
+    event, endpoint = delivery.event, delivery.endpoint
+    body = json.dumps(
+        {
+            'id': event.pk,
+            'type': event.event_type,
+            'created_at': event.created_at,
+            'data': event.payload,
+        },
+        cls=DjangoJSONEncoder,
+    ).encode('utf-8')
+    timestamp = str(int(time.time()))
+    headers = {
+        'Content-Type': 'application/json',
+        'X-Webhook-Id': str(event.pk),
+        'X-Webhook-Event': event.event_type,
+        'X-Webhook-Timestamp': timestamp,
+        'X-Webhook-Signature': f"sha256={sign(endpoint.secret, timestamp, body)}",
+    }
+    response = _pool_for(endpoint).urlopen(
+        'POST',
+        urllib3.util.parse_url(endpoint.url).request_uri,
+        body=body,
+        headers=headers,
+        retries=False,
+    )
+    if 200 <= response.status < 300:
+        return None
+    return f"HTTP {response.status}"
+
+
+def _send(delivery):
+    """POST one delivery; returns None on success or an error description."""
+    try:
+        return _post(delivery)
+    except urllib3.exceptions.HTTPError as exc:
+        return f"{type(exc).__name__}: {exc}"
+    except Exception as exc:
+        # Never raise: the outcome must be recorded like any other failure
+        logger.exception('Webhook delivery %s failed', delivery.pk)
+        return f"{type(exc).__name__}: {exc}"
+
+
+def _backoff(attempts):
+    delay = min(
+        settings.WEBHOOK_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+        settings.WEBHOOK_RETRY_MAX_SECONDS,
+    )
+    return timedelta(seconds=delay * random.uniform(1, 1.2))
+
+
+def _take_per_endpoint(deliveries):
+    """At most ``max_concurrency * WEBHOOK_ENDPOINT_ROUNDS`` deliveries per endpoint."""
+    taken = Counter()
+    kept = []
+    for delivery in deliveries:
+        limit = max(delivery.endpoint.max_concurrency, 1) * settings.WEBHOOK_ENDPOINT_ROUNDS
+        if taken[delivery.endpoint_id] < limit:
+            taken[delivery.endpoint_id] += 1
+            kept.append(delivery)
+    return kept
+
+
+def _lease_seconds(deliveries):
+    """
+    Time to send ``deliveries`` if every request runs into its timeouts.
+
+    Each endpoint sends ``max_concurrency`` at a time; endpoints are
+    assumed to take turns, which overestimates but never falls short.
+    """
+    per_request = CONNECT_TIMEOUT_SECONDS + settings.WEBHOOK_TIMEOUT_SECONDS
+    counts = Counter(delivery.endpoint_id for delivery in deliveries)
+    concurrency = {delivery.endpoint_id: max(delivery.endpoint.max_concurrency, 1) for delivery in deliveries}
+    rounds = sum(math.ceil(count / concurrency[endpoint_id]) for endpoint_id, count in counts.items())
+    return per_request * (rounds + 1)
+
+
+def _record(delivery, error):
+    """Store the outcome of a send, unless the delivery stopped being pending while in flight."""
+    finished = timezone.now()
+    attempts = delivery.attempts + 1
+    if error is None:
+        changes = {'status': 'delivered', 'delivered_at': finished, 'last_error': ''}
+    elif attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+        changes = {'status': 'failed', 'last_error': error}
+    else:
+        changes = {'next_attempt_at': finished + _backoff(attempts), 'last_error': error}
+    # A newer event may have superseded the delivery during the send;
+    # writing the in-memory row back would make it pending again.
+    WebhookDelivery.objects.filter(pk=delivery.pk, status='pending').update(attempts=attempts, **changes)
+
+
+def deliver_due(batch_size=200):
+    """
+    Send pending deliveries that are due, in parallel, recording each outcome as it arrives.
+
+    The batch is leased for as long as it could take, so an overlapping
+    relay run leaves it alone. If the run is interrupted, requests already
+    in flight are still recorded and the ones never started are released.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = _take_per_endpoint(
+            WebhookDelivery.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('event', 'endpoint')
+            .filter(status='pending', next_attempt_at__lte=now, endpoint__is_active=True)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        lease = now + timedelta(seconds=_lease_seconds(due))
+        WebhookDelivery.objects.filter(pk__in=[d.pk for d in due]).update(next_attempt_at=lease)
+    if not due:
+        return 0
+
+    executor = ThreadPoolExecutor(max_workers=settings.WEBHOOK_MAX_WORKERS)
+    futures = {executor.submit(_send, delivery): delivery for delivery in due}
+    recorded = set()
+    try:
+        for future in as_completed(futures):
+            _record(futures[future], future.result())
+            recorded.add(future)
+    finally:
+        # Reached early only when interrupted, e.g. by the task's soft time limit
+        executor.shutdown(wait=True, cancel_futures=True)
+        unsent = []
+        for future, delivery in futures.items():
+            if future in recorded:
+                continue
+            if future.cancelled():
+                unsent.append(delivery.pk)
+            else:
+                _record(delivery, future.result())
+        if unsent:
+            WebhookDelivery.objects.filter(pk__in=unsent).update(next_attempt_at=timezone.now())
+    return len(due)
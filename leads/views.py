@@ -1,36 +1,229 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from .models import Lead, Contact, Note, Correspondence, Reminder
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from .models import (
+    Lead, Contact, Note, Correspondence, Reminder, ArchivedNote,
+    ArchivedCorrespondence
+)
 from .serializers import (
     LeadSerializer, ContactSerializer, NoteSerializer,
-    CorrespondenceSerializer, ReminderSerializer
+    CorrespondenceSerializer, ReminderSerializer, BulkAssignSerializer,
+    MergeSerializer, LinkLeadsSerializer, LinkContactsSerializer
 )
 from .permissions import IsManagerOrReadOnly, IsOwnerOrManager
+from .utils.assignment import assign_leads, track_lead_change, track_leads_deleted
+from .utils.dedupe import recorded_clusters, merge_leads, merge_contacts
+from .utils.scoring import rescore_leads
+from .utils.archive import TieredResults
+from .utils.fast_serialization import lead_rows, contact_rows
+from .utils.linking import link, unlink
+from .utils.timeline import lead_timeline, InvalidCursor, DEFAULT_LIMIT, MAX_LIMIT
+from .utils.outbox import record_lead_saved, record_contact_saved, record_correspondence_created
+from rest_framework.utils.urls import replace_query_param
+from accounts.permissions import IsManager
 from django.utils import timezone
 
-class LeadViewSet(viewsets.ModelViewSet):
+class RescoreLeadMixin:
+    """Rescore the parent lead whenever an activity record is written."""
+    
+    def _rescore(self, *lead_ids):
+        lead_ids = [lead_id for lead_id in lead_ids if lead_id]
+        if lead_ids:
+            rescore_leads(lead_ids)
+    
+    def perform_create(self, serializer):
+        instance = serializer.save()
+        self._rescore(instance.lead_id)
+    
+    def perform_update(self, serializer):
+        previous_lead_id = serializer.instance.lead_id
+        instance = serializer.save()
+        self._rescore(previous_lead_id, instance.lead_id)
+    
+    def perform_destroy(self, instance):
+        lead_id = instance.lead_id
+        instance.delete()
+        self._rescore(lead_id)
+
+class ArchivedHistoryMixin:
+    """
+    List recent rows first and page on into the archive table.
+    
+    Archived rows can also be retrieved by id; they are read-only, so
+    updates and deletes only find live rows.
+    """
+    archive_model = None
+    
+    def get_archive_queryset(self):
+        user = self.request.user
+        queryset = self.archive_model.objects.all()
+        if not user.is_manager:
+            queryset = queryset.filter(created_by=user)
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        recent = self.filter_queryset(self.get_queryset())
+        archived = self.filter_queryset(self.get_archive_queryset())
+        ordering = recent.query.order_by
+        if ordering and not str(ordering[0]).startswith('-'):
+            results = TieredResults(archived, recent)
+        else:
+            results = TieredResults(recent, archived)
+        
+        page = self.paginate_queryset(results)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(results[:], many=True)
+        return Response(serializer.data)
+    
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            pass
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        instance = get_object_or_404(
+            self.get_archive_queryset(), **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, instance)
+        return Response(self.get_serializer(instance).data)
+
+class FastListMixin:
+    """Render list pages from ``fast_rows`` instead of the ModelSerializer."""
+    fast_rows = None
+    
+    def list(self, request, *args, **kwargs):
+        ids = self.filter_queryset(self.get_queryset()).values_list('pk', flat=True)
+        page = self.paginate_queryset(ids)
+        if page is not None:
+            return self.get_paginated_response(self.fast_rows.serialize_ids(page))
+        return Response(self.fast_rows.serialize_ids(list(ids)))
+
+class LeadViewSet(FastListMixin, viewsets.ModelViewSet):
+    fast_rows = lead_rows
+    throttle_action_scopes = {
+        'bulk_assign': 'bulk', 'merge': 'bulk', 'duplicates': 'bulk',
+        'link_contacts': 'bulk', 'unlink_contacts': 'bulk',
+    }
     queryset = Lead.objects.all()
     serializer_class = LeadSerializer
     permission_classes = [IsAuthenticated, IsManagerOrReadOnly, IsOwnerOrManager]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['first_name', 'last_name', 'email', 'company', 'phone']
-    ordering_fields = ['created_at', 'updated_at', 'last_contacted']
+    ordering_fields = ['created_at', 'updated_at', 'last_contacted', 'score']
     ordering = ['-created_at']
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_manager:
-            return Lead.objects.all()
-        return Lead.objects.filter(
-            Q(assigned_to=user) | Q(created_by=user)
-        )
+        if getattr(self, 'swagger_fake_view', False):
+            return Lead.objects.none()
+        return Lead.objects.visible_to(self.request.user)
     
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        with transaction.atomic():
+            lead = serializer.save(created_by=self.request.user)
+            strategy = settings.LEAD_ASSIGNMENT_STRATEGY
+            if strategy and lead.assigned_to_id is None:
+                assign_leads(Lead.objects.filter(pk=lead.pk), strategy)
+                lead.refresh_from_db(fields=['assigned_to', 'updated_at'])
+            else:
+                track_lead_change(lead)
+            record_lead_saved(lead, created=True)
+        lead.score = rescore_leads([lead.pk]).get(lead.pk, lead.score)
+    
+    def perform_update(self, serializer):
+        previous_assigned_id = serializer.instance.assigned_to_id
+        previous_status = serializer.instance.status
+        with transaction.atomic():
+            lead = serializer.save()
+            if (lead.assigned_to_id, lead.status) != (previous_assigned_id, previous_status):
+                track_lead_change(lead, previous_assigned_id, previous_status)
+            record_lead_saved(lead, previous_status=previous_status)
+        lead.score = rescore_leads([lead.pk]).get(lead.pk, lead.score)
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            track_leads_deleted([instance])
+            instance.delete()
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsManager])
+    def bulk_assign(self, request):
+        serializer = BulkAssignSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        if 'lead_ids' in data:
+            leads = Lead.objects.filter(id__in=data['lead_ids'])
+        else:
+            leads = Lead.objects.filter(assigned_to__isnull=True).exclude(status__in=Lead.CLOSED_STATUSES)
+        
+        assigned = assign_leads(leads, data['strategy'], data.get('agent_ids'))
+        return Response({
+            'assigned': sum(assigned.values()),
+            'agents': {str(agent_id): count for agent_id, count in assigned.items()},
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsManager])
+    def duplicates(self, request):
+        clusters = recorded_clusters(self.get_queryset())
+        page = self.paginate_queryset(clusters)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(clusters)
+    
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsManager])
+    def merge(self, request, pk=None):
+        lead = self.get_object()
+        serializer = MergeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        merged = merge_leads(lead, serializer.validated_data['duplicate_ids'])
+        lead.score = rescore_leads([lead.pk]).get(lead.pk, lead.score)
+        return Response({'merged': merged, 'lead': LeadSerializer(lead).data})
+    
+    @action(detail=True, methods=['post'])
+    def link_contacts(self, request, pk=None):
+        lead = self.get_object()
+        serializer = LinkContactsSerializer(data=request.data, context=self.get_serializer_context())
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        contact_ids = serializer.validated_data['contact_ids']
+        link(contact_ids, [lead.pk])
+        return Response({'linked': len(contact_ids)})
+    
+    @action(detail=True, methods=['post'])
+    def unlink_contacts(self, request, pk=None):
+        lead = self.get_object()
+        serializer = LinkContactsSerializer(data=request.data, context=self.get_serializer_context())
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        unlinked = unlink(serializer.validated_data['contact_ids'], [lead.pk])
+        return Response({'unlinked': unlinked})
+    
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        lead = self.get_object()
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        
+        try:
+            items, next_cursor = lead_timeline(lead, request.query_params.get('cursor'), max(limit, 1))
+        except InvalidCursor as exc:
+            return Response({'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        return Response({'next': next_url, 'results': items})
     
     @action(detail=True, methods=['post'])
     def add_note(self, request, pk=None):
@@ -38,6 +231,7 @@ class LeadViewSet(viewsets.ModelViewSet):
         serializer = NoteSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(lead=lead, created_by=request.user)
+            rescore_leads([lead.pk])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -47,10 +241,15 @@ class LeadViewSet(viewsets.ModelViewSet):
         serializer = ReminderSerializer(data=request.data)
         if serializer.is_valid():
             reminder = serializer.save(lead=lead, created_by=request.user)
+            rescore_leads([lead.pk])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class ContactViewSet(viewsets.ModelViewSet):
+class ContactViewSet(FastListMixin, viewsets.ModelViewSet):
+    fast_rows = contact_rows
+    throttle_action_scopes = {
+        'merge': 'bulk', 'duplicates': 'bulk', 'link_leads': 'bulk', 'unlink_leads': 'bulk',
+    }
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
     permission_classes = [IsAuthenticated, IsManagerOrReadOnly, IsOwnerOrManager]
@@ -60,24 +259,71 @@ class ContactViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_manager:
-            return Contact.objects.all()
-        return Contact.objects.filter(created_by=user)
+        if getattr(self, 'swagger_fake_view', False):
+            return Contact.objects.none()
+        return Contact.objects.visible_to(self.request.user)
     
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        with transaction.atomic():
+            contact = serializer.save(created_by=self.request.user)
+            record_contact_saved(contact, created=True)
+    
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            contact = serializer.save()
+            record_contact_saved(contact)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsManager])
+    def duplicates(self, request):
+        clusters = recorded_clusters(self.get_queryset())
+        page = self.paginate_queryset(clusters)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(clusters)
+    
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsManager])
+    def merge(self, request, pk=None):
+        contact = self.get_object()
+        serializer = MergeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        merged = merge_contacts(contact, serializer.validated_data['duplicate_ids'])
+        return Response({'merged': merged, 'contact': ContactSerializer(contact).data})
+    
+    @action(detail=True, methods=['post'])
+    def link_leads(self, request, pk=None):
+        contact = self.get_object()
+        serializer = LinkLeadsSerializer(data=request.data, context=self.get_serializer_context())
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        lead_ids = serializer.validated_data['lead_ids']
+        link([contact.pk], lead_ids)
+        return Response({'linked': len(lead_ids)})
+    
+    @action(detail=True, methods=['post'])
+    def unlink_leads(self, request, pk=None):
+        contact = self.get_object()
+        serializer = LinkLeadsSerializer(data=request.data, context=self.get_serializer_context())
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        unlinked = unlink([contact.pk], serializer.validated_data['lead_ids'])
+        return Response({'unlinked': unlinked})
     
     @action(detail=True, methods=['post'])
     def add_correspondence(self, request, pk=None):
         contact = self.get_object()
         serializer = CorrespondenceSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(contact=contact, created_by=request.user)
+            with transaction.atomic():
+                correspondence = serializer.save(contact=contact, created_by=request.user)
+                record_correspondence_created(correspondence)
+            if correspondence.lead_id:
+                rescore_leads([correspondence.lead_id])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class NoteViewSet(viewsets.ModelViewSet):
+class NoteViewSet(RescoreLeadMixin, ArchivedHistoryMixin, viewsets.ModelViewSet):
+    archive_model = ArchivedNote
     queryset = Note.objects.all()
     serializer_class = NoteSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrManager]
@@ -86,12 +332,15 @@ class NoteViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
     
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Note.objects.none()
         user = self.request.user
         if user.is_manager:
             return Note.objects.all()
         return Note.objects.filter(created_by=user)
 
-class CorrespondenceViewSet(viewsets.ModelViewSet):
+class CorrespondenceViewSet(RescoreLeadMixin, ArchivedHistoryMixin, viewsets.ModelViewSet):
+    archive_model = ArchivedCorrespondence
     queryset = Correspondence.objects.all()
     serializer_class = CorrespondenceSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrManager]
@@ -100,12 +349,19 @@ class CorrespondenceViewSet(viewsets.ModelViewSet):
     ordering = ['-date']
     
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Correspondence.objects.none()
         user = self.request.user
         if user.is_manager:
             return Correspondence.objects.all()
         return Correspondence.objects.filter(created_by=user)
+    
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            record_correspondence_created(serializer.instance)
 
-class ReminderViewSet(viewsets.ModelViewSet):
+class ReminderViewSet(RescoreLeadMixin, viewsets.ModelViewSet):
     queryset = Reminder.objects.all()
     serializer_class = ReminderSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrManager]
@@ -114,6 +370,8 @@ class ReminderViewSet(viewsets.ModelViewSet):
     ordering = ['due_date']
     
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Reminder.objects.none()
         user = self.request.user
         queryset = Reminder.objects.all()
         if not user.is_manager: